@@ -0,0 +1,39 @@
+"""
+Throughput of the PDF output compared to the HTML one, on the Tanah Yomi bookmark.
+
+    cd bookmarker && python -m benchmarks.pdf_throughput
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.render import render_tanah_yomi
+from src.pdf import PdfUnavailable, html_to_pdf
+from src.utils import get_simhat_tora_by
+
+YEAR = "תשפה"
+RUNS = 8
+WORKERS = 2
+
+
+def throughput(render, runs: int, workers: int = 1) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: render(), range(runs)))
+    return runs / (time.perf_counter() - start)
+
+
+def main() -> None:
+    dates = get_simhat_tora_by(YEAR)
+    html = render_tanah_yomi(dates, 10, 15, 12)
+    print(f"{'html':<16} {throughput(lambda: render_tanah_yomi(dates, 10, 15, 12), RUNS):8.1f} docs/s")
+    try:
+        html_to_pdf(html)
+    except PdfUnavailable as exc:
+        print(f"pdf skipped: {exc}")
+        return
+    print(f"{'pdf':<16} {throughput(lambda: html_to_pdf(html), RUNS):8.1f} docs/s")
+    print(f"{f'pdf x{WORKERS} workers':<16} {throughput(lambda: html_to_pdf(html), RUNS, WORKERS):8.1f} docs/s")
+
+
+if __name__ == "__main__":
+    main()
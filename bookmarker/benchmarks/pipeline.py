@@ -0,0 +1,154 @@
+"""
+Time and peak memory of every stage of the bookmark pipeline, from the
+calendar to the printable html, for one to several years of the bundled
+Tanah Yomi schedules on a few page sizes and fonts.
+
+    cd bookmarker && python -m benchmarks.pipeline [--output results.json]
+    cd bookmarker && python -m benchmarks.pipeline --save-baseline
+    cd bookmarker && python -m benchmarks.pipeline --baseline benchmarks/baseline.json
+
+Stages run on the output of the previous one. The lru caches of the
+pipeline are cleared before every run, so runs don't depend on their order.
+Against a baseline, a stage slower or bigger than `--tolerance` over it is
+reported as a regression, and the exit code is 1.
+"""
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from itertools import cycle, islice
+from pathlib import Path
+from typing import Any, Callable
+
+from src.config import Content, PageConfig, Size
+from src.input_generator import HebrewCalendar, year_table
+from src.output_generators import iter_printable_html, make_bookmark_svgs
+from src.svg_generator import _qr_svg_snippet, get_svg_tables
+from src.utils import convert_date, get_idx
+
+BASELINE = Path(__file__).with_name("baseline.json")
+START_DATE = datetime.date(2024, 10, 25)
+URL = "www.tanachyomi.co.il"
+
+YEARS = [1, 2, 4]
+PAGES = [(10, 15, 12), (5, 20, 10), (15, 21, 14)]
+
+
+def chapters(days: int) -> list[str]:
+    return Path(f"examples/tanah_yomi_{days}.csv").read_text(encoding="utf-8").splitlines()
+
+
+def clear_caches() -> None:
+    year_table.cache_clear()
+    HebrewCalendar._get_extra_holidays.cache_clear()
+    _qr_svg_snippet.cache_clear()
+
+
+def measure(stage: Callable[[], Any], repeat: int) -> tuple[Any, dict]:
+    """Best time of `repeat` runs, and peak memory of one more traced run"""
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = stage()
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    clear_caches()
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": min(times), "peak_bytes": peak}
+
+
+def run_case(years: int, width: float, height: float, font: float, repeat: int) -> dict:
+    lines = chapters(297)
+    end_date = START_DATE.replace(year=START_DATE.year + years) - datetime.timedelta(days=1)
+    config = PageConfig(Size(width, height), font)
+    content = Content(title="Tanah Yomi", subtitle="benchmark", url=URL, logo=None)
+    stages = {}
+
+    calendar, stages["HebrewCalendar"] = measure(
+        lambda: HebrewCalendar(*convert_date(START_DATE, end_date)), repeat
+    )
+    days = calendar.learning_days()
+    rows, stages["generate_csv"] = measure(
+        lambda: calendar.generate_csv(islice(cycle(lines), days)), repeat
+    )
+    idx, stages["get_idx"] = measure(lambda: get_idx(config, len(rows)), repeat)
+    tables, stages["get_svg_tables"] = measure(lambda: get_svg_tables(rows, config, idx), repeat)
+    svgs, stages["make_bookmark_svgs"] = measure(lambda: make_bookmark_svgs(content, tables, config), repeat)
+    _, stages["_qr_svg_snippet"] = measure(lambda: _qr_svg_snippet(URL), repeat)
+    _, stages["iter_printable_html"] = measure(lambda: "".join(iter_printable_html(svgs, config)), repeat)
+
+    return {
+        "case": f"{years}y-{width}x{height}-f{font}",
+        "rows": len(rows),
+        "pages": len(tables),
+        "stages": stages,
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float, min_seconds: float) -> list[str]:
+    found = []
+    base_cases = {case["case"]: case for case in baseline["cases"]}
+    for case in results["cases"]:
+        base = base_cases.get(case["case"])
+        if base is None:
+            continue
+        for stage, measured in case["stages"].items():
+            if stage not in base["stages"]:
+                continue
+            for metric, value in measured.items():
+                before = base["stages"][stage][metric]
+                if metric == "seconds" and max(before, value) < min_seconds:
+                    continue  # too short to time reliably
+                if before and value > before * (1 + tolerance):
+                    found.append(f"{case['case']} {stage} {metric}: {before:.4g} -> {value:.4g}")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=7, help="runs per stage, the best is reported")
+    parser.add_argument("--output", type=Path, help="write the results to this json file")
+    parser.add_argument("--baseline", type=Path, help="compare the results to this json file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed growth over the baseline")
+    parser.add_argument("--min-seconds", type=float, default=0.001, help="shorter stages are not compared")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "cases": [run_case(years, *page, args.repeat) for years in YEARS for page in PAGES],
+    }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(report)
+    if args.save_baseline:
+        BASELINE.write_text(report)
+    print(report)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        found = regressions(results, baseline, args.tolerance, args.min_seconds)
+        for regression in found:
+            print(f"regression: {regression}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
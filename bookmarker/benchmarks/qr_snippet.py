@@ -0,0 +1,39 @@
+"""
+Per-page cost of the bookmark footer QR code, with and without the cache.
+
+    cd bookmarker && python -m benchmarks.qr_snippet
+"""
+import timeit
+
+from src.config import PageConfig, Size
+from src.svg_generator import PageGenerator, SvgConfig, TableGenerator, _qr_svg_snippet
+
+URL = "www.tanachyomi.co.il"
+NUMBER = 200
+
+
+def main() -> None:
+    config = PageConfig(Size(10, 15), 12)
+    conf = SvgConfig(
+        page_config=config,
+        title_offset=30,
+        table_x_offset=20,
+        table_y_offset=70,
+        footer_margin=12,
+        qr_size=35,
+    )
+    page = PageGenerator(conf, "Title", None, URL, None, TableGenerator(config, []))
+
+    uncached = _qr_svg_snippet.__wrapped__
+    _qr_svg_snippet(URL)
+    timings = {
+        "qr encode (uncached)": timeit.timeit(lambda: uncached(URL), number=NUMBER),
+        "qr snippet (cached)": timeit.timeit(lambda: _qr_svg_snippet(URL), number=NUMBER),
+        "page footer (cached)": timeit.timeit(lambda: page.get_footer(URL, None), number=NUMBER),
+    }
+    for name, total in timings.items():
+        print(f"{name:<24} {total / NUMBER * 1e6:10.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import zipfile
+from io import BytesIO
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from src.config import Content, Logo
+from src.executor import render_pool
+from src.ingest import CsvSource
+from src.metrics import metrics
+from src.output_generators import render_html, render_svgs
+from src.render import calendar_rows, rows_bookmark
+
+MAX_BATCH_JOBS = 64
+
+
+class BookmarkJob(BaseModel):
+    """One bookmark of a batch, with the options of /bookmarker/html"""
+
+    name: str | None = Field(None, description="File name in the archive (default bookmarks<n>)")
+    start_date: datetime.date
+    end_date: datetime.date | None = None
+    title: str = "Title"
+    subtitle: str | None = None
+    url: str | None = None
+    width: float = 10.0
+    height: float = 15.0
+    font: float = 12.0
+    shabbos: bool = True
+    major_holidays: bool = True
+    minor_holidays: bool = False
+    extra_holidays: bool = True
+    bold: bool = True
+    output: Literal["html", "svgs"] = "html"
+
+    def calendar_key(self) -> tuple:
+        return (
+            self.start_date,
+            self.end_date,
+            self.major_holidays,
+            self.minor_holidays,
+            self.extra_holidays,
+            self.shabbos,
+            self.bold,
+        )
+
+
+def _job_names(jobs: list[BookmarkJob]) -> list[str]:
+    names = []
+    for i, job in enumerate(jobs, 1):
+        # only the last part of a path, never a directory of the archive or above it
+        name = (job.name or "").replace("\\", "/").rsplit("/", 1)[-1].strip()
+        if name in ("", ".", ".."):
+            name = f"bookmarks{i}"
+        if name in names:
+            name = f"{name}_{i}"
+        names.append(name)
+    return names
+
+
+def zip_batch(names: list[str], outputs: list[str | list[bytes]]) -> bytes:
+    buf = BytesIO()
+    with metrics.stage("zip"):
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, output in zip(names, outputs):
+                if isinstance(output, str):
+                    archive.writestr(f"{name}.html", output)
+                    continue
+                for i, page in enumerate(output, 1):
+                    archive.writestr(f"{name}/bookmark{i}.svg", page)
+    return buf.getvalue()
+
+
+async def render_batch(jobs: list[BookmarkJob], csv_content: CsvSource, logo: Logo | None) -> bytes:
+    """
+    Render every job of the batch in the render pool, sharing the csv
+    parsing and the calendars between jobs of the same dates and holidays.
+    """
+    rows = await render_pool.run(calendar_rows, csv_content, [job.calendar_key() for job in jobs])
+
+    # a batch occupies the workers, not the queue of other requests
+    slots = asyncio.Semaphore(render_pool.workers)
+
+    async def render(job: BookmarkJob):
+        async with slots:
+            return await render_pool.run(
+                rows_bookmark,
+                render_html if job.output == "html" else render_svgs,
+                rows[job.calendar_key()],
+                Content(title=job.title, subtitle=job.subtitle, url=job.url, logo=logo),
+                job.width,
+                job.height,
+                job.font,
+            )
+
+    outputs = await asyncio.gather(*(render(job) for job in jobs))
+    return await render_pool.run(zip_batch, _job_names(jobs), outputs)
@@ -0,0 +1,253 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from email.utils import formatdate
+from pathlib import Path
+from functools import update_wrapper
+from typing import Any, Callable, Hashable, NamedTuple
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+CachedContent = namedtuple("CachedContent", ["body", "etag", "last_modified"])
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "max_bytes", "bytes"])
+
+
+class Artifact(NamedTuple):
+    path: Path
+    stat: os.stat_result
+
+
+class ContentCache:
+    """
+    Bounded LRU of rendered payloads, with an optional on-disk tier that
+    survives restarts (and can be shared by workers on the same machine).
+    The disk tier is bounded too, past `max_disk_bytes` the files written
+    first are deleted. Its reads and writes block: call them off the event loop.
+    """
+
+    def __init__(
+        self, namespace: str, max_bytes: int, directory: str | None = None, max_disk_bytes: int = 512 * 2**20
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.directory = Path(directory) / namespace if directory else None
+        self._entries: OrderedDict[Hashable, CachedContent] = OrderedDict()
+        self._size = 0
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._trim()
+
+    def _path(self, key: Hashable) -> Path:
+        return self.directory / hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def _trim(self) -> None:
+        """
+        Delete the oldest files past max_disk_bytes. The running size is only
+        this process's estimate, the directory is listed again when it's over.
+        """
+        files = []
+        for path in self.directory.iterdir():
+            if path.suffix == ".tmp":  # being written
+                continue
+            try:
+                files.append((path.stat(), path))
+            except FileNotFoundError:  # removed by another worker
+                pass
+        files.sort(key=lambda file: file[0].st_mtime)
+        size = sum(stat.st_size for stat, _ in files)
+        for stat, path in files:
+            if size <= self.max_disk_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+        self._disk_size = size
+
+    def _remember(self, key: Hashable, entry: CachedContent) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            if (old := self._entries.pop(key, None)) is not None:
+                self._size -= len(old.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+    def get(self, key: Hashable) -> CachedContent | None:
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            body = path.read_bytes()
+            last_modified = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        entry = CachedContent(body, _etag(body), last_modified)
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> CachedContent:
+        entry = CachedContent(body, _etag(body), time.time())
+        self._remember(key, entry)
+        if self.directory and len(body) <= self.max_disk_bytes:
+            path = self._path(key)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+            with self._lock:
+                self._disk_size += len(body)
+                if self._disk_size > self.max_disk_bytes:
+                    self._trim()
+        return entry
+
+
+class SizedLru:
+    """
+    Like functools.lru_cache, bounded by the size of the results rather than
+    their number: `weigh` estimates the bytes of a result, a result larger
+    than `max_bytes` is returned without being kept.
+    """
+
+    def __init__(self, fn: Callable, max_bytes: int, weigh: Callable[[Any], int]) -> None:
+        self.fn = fn
+        self.max_bytes = max_bytes
+        self.weigh = weigh
+        self._entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args: Hashable) -> Any:
+        with self._lock:
+            if (entry := self._entries.get(args)) is not None:
+                self._entries.move_to_end(args)
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+        result = self.fn(*args)
+        size = self.weigh(result)
+        if size > self.max_bytes:
+            return result
+        with self._lock:
+            if (old := self._entries.pop(args, None)) is not None:
+                self._size -= old[1]
+            self._entries[args] = (result, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+        return result
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.max_bytes, self._size)
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = self._hits = self._misses = 0
+
+
+def sized_cache(max_bytes: int, weigh: Callable[[Any], int]) -> Callable[[Callable], SizedLru]:
+    """Decorator of a SizedLru"""
+    return lambda fn: update_wrapper(SizedLru(fn, max_bytes, weigh), fn)
+
+
+class ArtifactStore:
+    """
+    Directory of gzipped payloads rendered ahead of time (see precompute.py),
+    served from disk as they are to clients accepting gzip.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def path(self, name: str) -> Path:
+        return self.directory / f"{name}.gz"
+
+    def get(self, name: str) -> Artifact | None:
+        """The stored file and its stat, blocking on the disk: call it off the event loop"""
+        path = self.path(name)
+        try:
+            return Artifact(path, path.stat())
+        except FileNotFoundError:
+            return None
+
+    def put(self, name: str, body: bytes) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(name)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        # mtime=0 keeps the archive, and its etag, stable across rebuilds of the same content
+        tmp.write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+        os.replace(tmp, path)
+        return path
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
+
+def cached_response(entry: CachedContent, request: Request, media_type: str, max_age: int = 3600) -> Response:
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}",
+    }
+    if _not_modified(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type=media_type, headers=headers)
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip, explicitly or through *, with a q-value above 0"""
+    qualities = {}
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def gzip_file_response(artifact: Artifact, request: Request, media_type: str, max_age: int = 3600) -> Response:
+    """
+    A gzipped file sent as is, with `Content-Encoding: gzip`. The server
+    streams it from disk (with zero-copy sendfile where it supports it).
+    """
+    path, stat = artifact
+    headers = {
+        "ETag": f'"gz-{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": f"public, max-age={max_age}",
+        "Content-Encoding": "gzip",
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
@@ -1,7 +1,10 @@
+import datetime
 from collections import namedtuple
 from dataclasses import dataclass, field
 from typing import Callable, Any
 
+from fastapi import Query
+
 Size = namedtuple("Size", ["width", "height"])
 Row = namedtuple("Row", ["date", "info", "bold", "underline"], defaults=(None,)*4)
 
@@ -50,11 +53,53 @@ class Content:
     url: str|None
     logo: Logo|None
 
+
+@dataclass(frozen=True)
+class CalendarOptions:
+    """
+    Options of the bookmarks laid on the calendar, read from the query string
+    as a FastAPI dependency (Depends()), and handed as is to the rendering jobs.
+    """
+
+    start_date: datetime.date = Query(
+        ...,
+        description="Start date (in the format of 2024-10-03)",
+        examples=["2024-10-03"],
+    )
+    end_date: datetime.date | None = Query(
+        None,
+        description="End date, inclusive (default to 1 hebrew year)",
+        examples=[None, "2025-09-22"],
+    )
+    title: str = Query("Title", description="Title")
+    subtitle: str | None = Query(None, description="Sub Title")
+    url: str | None = Query(None, description="Link on the bookmark")
+    width: float = Query(10, description="Bookmark width (cm)")
+    height: float = Query(15, description="Bookmark height (cm)")
+    font: float = Query(12, description="Font size")
+    shabbos: bool = Query(True, description="Do not schedule learning on Shabbos")
+    major_holidays: bool = Query(True, description="Do not schedule learning on non-working holidays")
+    minor_holidays: bool = Query(
+        False,
+        description="Do not schedule learning on working holidays (Hanuka, Hol Hamoed, etc.)",
+    )
+    extra_holidays: bool = Query(
+        True,
+        description="Do not schedule learning on Purim, Tishaa Beav and Yom Haatzmaut",
+    )
+    bold: bool = Query(True, description="Bold Shabbos or any non-learning day")
+
+    def calendar_key(self) -> tuple[datetime.date, datetime.date | None, bool, bool, bool]:
+        return self.start_date, self.end_date, self.major_holidays, self.minor_holidays, self.extra_holidays
+
+    def content(self, logo: Logo | None) -> Content:
+        return Content(title=self.title, subtitle=self.subtitle, url=self.url, logo=logo)
+
 @dataclass
 class Args:
     input: list[Row]
-    out: str
+    out: str | None
     width: float
     height: float
     font_size: float
-    printer: Callable[[Content, list[Any], PageConfig, str], None]
+    printer: Callable[[Content, list[Any], PageConfig, str | None], Any]
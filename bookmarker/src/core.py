@@ -1,4 +1,7 @@
+from typing import Any
+
 from src.config import Args, PageConfig, Row, Size, Content
+from src.metrics import metrics, size_class
 from src.svg_generator import get_svg_tables
 from src.utils import get_idx, parse_csv, read_csv
 
@@ -11,8 +14,10 @@ def from_str(args_input: str) -> list[Row]:
     return parse_csv(args_input.splitlines())
 
 
-def create_bookmark(args: Args, content: Content) -> None:
+def create_bookmark(args: Args, content: Content) -> Any:
     config = PageConfig(Size(args.width, args.height), args.font_size)
-    idx = get_idx(config, len(args.input))
-    bookmarks = get_svg_tables(args.input, config, idx)
-    args.printer(content, bookmarks, config, args.out)
+    with metrics.stage("layout", rows=size_class(len(args.input))) as stage:
+        idx = get_idx(config, len(args.input))
+        bookmarks = get_svg_tables(args.input, config, idx)
+        stage.label(pages=size_class(len(bookmarks)))
+    return args.printer(content, bookmarks, config, args.out)
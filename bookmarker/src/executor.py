@@ -0,0 +1,84 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+
+class RenderPoolFull(Exception):
+    pass
+
+
+class RenderPool:
+    """
+    Runs the CPU bound rendering jobs off the event loop.
+    At most `workers` jobs run at once, and at most `max_queue` wait for a
+    free worker, later requests are rejected with RenderPoolFull.
+    A process pool renders on all cores, but its jobs, arguments and
+    results have to be picklable.
+    """
+
+    def __init__(self, kind: str, workers: int, max_queue: int) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._slots = asyncio.Semaphore(workers)
+
+        self.running = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="render")
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise RenderPoolFull(f"{self.waiting} rendering jobs are already waiting")
+
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+render_pool = RenderPool(
+    kind=os.environ.get("BOOKMARKER_EXECUTOR", "thread"),
+    workers=int(os.environ.get("BOOKMARKER_WORKERS", os.cpu_count() or 1)),
+    max_queue=int(os.environ.get("BOOKMARKER_MAX_QUEUE", 32)),
+)
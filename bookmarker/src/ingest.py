@@ -0,0 +1,103 @@
+import codecs
+import csv
+import os
+from io import IncrementalNewlineDecoder, StringIO
+from typing import BinaryIO, Iterator
+
+from fastapi import UploadFile
+
+from src.config import Row
+from src.metrics import metrics
+
+MAX_CSV_BYTES = int(os.environ.get("BOOKMARKER_MAX_CSV_BYTES", 10 * 2**20))
+CHUNK_SIZE = 64 * 1024
+
+CsvSource = bytes | BinaryIO
+
+
+class CsvTooLarge(Exception):
+    pass
+
+
+class CsvInvalid(Exception):
+    pass
+
+
+def _too_large(max_bytes: int) -> CsvTooLarge:
+    return CsvTooLarge(f"CSV file is limited to {max_bytes} bytes")
+
+
+def check_upload_size(upload: UploadFile, max_bytes: int = MAX_CSV_BYTES) -> None:
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_CSV_BYTES) -> bytes:
+    check_upload_size(upload, max_bytes)
+    content = bytearray()
+    with metrics.stage("upload_read"):
+        while chunk := await upload.read(CHUNK_SIZE):
+            content += chunk
+            if len(content) > max_bytes:
+                raise _too_large(max_bytes)
+    return bytes(content)
+
+
+def _chunks(source: CsvSource, max_bytes: int) -> Iterator[bytes]:
+    if isinstance(source, bytes):
+        if len(source) > max_bytes:
+            raise _too_large(max_bytes)
+        view = memoryview(source)
+        for i in range(0, len(view), CHUNK_SIZE):
+            yield view[i : i + CHUNK_SIZE]
+        return
+
+    yield from metrics.timed(_read(source, max_bytes), "upload_read")
+
+
+def _read(source: BinaryIO, max_bytes: int) -> Iterator[bytes]:
+    # the spooled upload read inside the render job, in thread mode
+    total = 0
+    while chunk := source.read(CHUNK_SIZE):
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        yield chunk
+
+
+def _lines(source: CsvSource, max_bytes: int) -> Iterator[str]:
+    # universal newlines: \r\n and the lone \r of old Mac files become \n, even across chunks
+    decoder = IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8-sig")(), translate=True)
+    pending = ""
+    for chunk in _chunks(source, max_bytes):
+        pending += decoder.decode(chunk)
+        cut = pending.rfind("\n") + 1
+        if cut:
+            yield from StringIO(pending[:cut])
+            pending = pending[cut:]
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def iter_csv(source: CsvSource, max_bytes: int = MAX_CSV_BYTES) -> Iterator[list[str]]:
+    """
+    Lazily parse an uploaded csv, read and decoded chunk by chunk.
+    Only as much of the file as the consumer asks for is read.
+    """
+    try:
+        yield from csv.reader(_lines(source, max_bytes))
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise CsvInvalid(f"Invalid CSV file: {exc}") from exc
+
+
+def iter_chapters(source: CsvSource, max_bytes: int = MAX_CSV_BYTES) -> Iterator[str]:
+    """
+    Every line as a chapter, a blank line is an empty one. The file has a
+    single column, the commas of an unquoted label are part of it.
+    """
+    return (",".join(row) for row in iter_csv(source, max_bytes))
+
+
+def iter_rows(source: CsvSource, max_bytes: int = MAX_CSV_BYTES) -> Iterator[Row]:
+    return (Row(*row[: len(Row._fields)]) if row else Row("") for row in iter_csv(source, max_bytes))
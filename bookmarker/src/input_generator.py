@@ -1,4 +1,5 @@
 import csv
+from functools import lru_cache
 from typing import Iterator
 
 from pyluach import parshios
@@ -18,7 +19,7 @@ class HebrewCalendar:
         extra_holidays: bool = True,
     ):
         self._date_info = list(
-            self._generate_hebrew_dates(
+            self._slice_years(
                 start_date,
                 end_date,
                 major_holidays=major_holidays,
@@ -27,6 +28,22 @@ class HebrewCalendar:
             )
         )
 
+    @staticmethod
+    def _slice_years(
+        start_date: HebrewDate,
+        end_date: HebrewDate,
+        /,
+        major_holidays: bool = True,
+        minor_holidays: bool = False,
+        extra_holidays: bool = True,
+    ):
+        for year in range(start_date.year, end_date.year + 1):
+            table = year_table(year, major_holidays, minor_holidays, extra_holidays)
+            first_day = HebrewDate(year, 7, 1).jd
+            begin = max(int(start_date.jd - first_day), 0)
+            end = min(int(end_date.jd - first_day) + 1, len(table))
+            yield from table[begin:end]
+
     @staticmethod
     def _get_yom_haatzmaut(year: int) -> HebrewDate:
         date = HebrewDate(year=year, month=2, day=5)
@@ -41,20 +58,24 @@ class HebrewCalendar:
                 return date
 
     @staticmethod
-    def _get_extra_holiday(date: HebrewDate) -> str | None:
+    @lru_cache(maxsize=16)
+    def _get_extra_holidays(year: int) -> dict[HebrewDate, str]:
+        date = HebrewDate(year=year, month=7, day=1)
         purim = date.replace(month=1, day=14).subtract(months=1)
-        yom_haatzmaut = HebrewCalendar._get_yom_haatzmaut(date.year)
         tishaa_beav = date.replace(month=5, day=9)
-        holidays = (purim, tishaa_beav)
-        if date in holidays:
-            return date.holiday(israel=True, hebrew=True)
-        if date == yom_haatzmaut:
-            return "יום העצמאות"
+        holidays = {
+            day: day.holiday(israel=True, hebrew=True) for day in (purim, tishaa_beav)
+        }
+        yom_haatzmaut = HebrewCalendar._get_yom_haatzmaut(year)
+        holidays.setdefault(yom_haatzmaut, "יום העצמאות")
+        return holidays
 
-        return None
+    @staticmethod
+    def _get_extra_holiday(date: HebrewDate) -> str | None:
+        return HebrewCalendar._get_extra_holidays(date.year).get(date)
 
+    @staticmethod
     def _generate_hebrew_dates(
-        self,
         current_date: HebrewDate,
         end_date: HebrewDate,
         /,
@@ -66,9 +87,9 @@ class HebrewCalendar:
             info = None
             day_of_week = current_date.weekday()
             
-            last_day_of_month = False
-            if current_date.month_name(True) != current_date.add(days=1).month_name(True):
-                last_day_of_month = True
+            next_date = current_date.add(days=1)
+            month_name = current_date.month_name(True)
+            last_day_of_month = month_name != next_date.month_name(True)
 
             if day_of_week == 7:
                 # shabbos title
@@ -93,11 +114,11 @@ class HebrewCalendar:
                     info = HebrewCalendar._get_extra_holiday(current_date)
 
             yield (
-                f"{current_date.hebrew_day(False)} {current_date.month_name(True)}",
+                f"{current_date.hebrew_day(False)} {month_name}",
                 info,
                 last_day_of_month,
             )
-            current_date = current_date.add(days=1)
+            current_date = next_date
 
     def learning_days(self, shabbos: bool = True) -> int:
         return sum(1 for date, info, _ in self._date_info if not (info and shabbos))
@@ -169,6 +190,29 @@ class HebrewCalendar:
             )
 
 
+@lru_cache(maxsize=32)
+def year_table(
+    year: int,
+    major_holidays: bool = True,
+    minor_holidays: bool = False,
+    extra_holidays: bool = True,
+) -> tuple[tuple[str, str | None, bool], ...]:
+    """
+    Resolved (date, info, last_day_of_month) records of a whole hebrew year,
+    from 1 Tishrei to the last day of Elul. HebrewCalendar slices these, so
+    repeated calendars of the same year do not go through pyluach again.
+    """
+    return tuple(
+        HebrewCalendar._generate_hebrew_dates(
+            HebrewDate(year, 7, 1),
+            HebrewDate(year + 1, 7, 1).subtract(days=1),
+            major_holidays=major_holidays,
+            minor_holidays=minor_holidays,
+            extra_holidays=extra_holidays,
+        )
+    )
+
+
 def write_to_csv(hebrew_dates, filename):
     with open(filename, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.writer(file)
@@ -1,23 +1,88 @@
+import asyncio
 import base64
-import datetime
-import shutil
-import tempfile
-from io import BytesIO, StringIO
-from pathlib import Path
-
-from fastapi import FastAPI, File, HTTPException, Query, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+import gzip
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Callable
+
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+
+from src.batch import MAX_BATCH_JOBS, BookmarkJob, render_batch
+from src.cache import (
+    ArtifactStore,
+    ContentCache,
+    accepts_gzip,
+    cached_response,
+    gzip_file_response,
+)
+from src.config import CalendarOptions, Content, Logo, PageConfig, Size
+from src.executor import RenderPoolFull, render_pool
+from src.ingest import CsvInvalid, CsvSource, CsvTooLarge, check_upload_size, read_upload
+from src.metrics import metrics
+from src.output_generators import render_svgs_zip
+from src.pdf import PdfUnavailable, render_pdf
+from src.precompute import (
+    TANAH_DIR,
+    TANAH_PRESETS,
+    TANAH_YEARS,
+    artifact_name,
+    missing,
+    render_artifact,
+    upcoming_years,
+)
+from src.render import SederMismatch, calendar_bookmark, csv_bookmark, render_tanah_yomi, schedule_bookmark
+from src.schedule import Schedule
+from src.stages import STAGES, PageNotFound, document, html_document, keep, preview_page
+from src.utils import get_simhat_tora_by
+
+tanah_store = ArtifactStore(TANAH_DIR) if TANAH_DIR else None
+
+
+WARMUP_BACKOFF = 1.0  # seconds between looks at a busy render pool
+logger = logging.getLogger(__name__)
+
+
+async def _warm_up_tanah_store() -> None:
+    """
+    Render the missing precomputed Tanah Yomi bookmarks one at a time, only
+    when a worker of the render pool is free and no request waits for one.
+    """
+    try:
+        todo = await run_in_threadpool(missing, tanah_store, upcoming_years(TANAH_YEARS), TANAH_PRESETS)
+    except OSError:
+        logger.exception("Can't read the Tanah Yomi store %s", TANAH_DIR)
+        return
+    for year, preset in todo:
+        while render_pool.waiting or render_pool.running >= render_pool.workers:
+            await asyncio.sleep(WARMUP_BACKOFF)
+        try:
+            await render_pool.run(render_artifact, TANAH_DIR, year, preset)
+        except Exception:
+            logger.exception("Warming up the Tanah Yomi bookmark of %s %s failed", year, preset)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up = None
+    if tanah_store and os.environ.get("BOOKMARKER_TANAH_WARMUP", "0").lower() in ("1", "true", "yes"):
+        warm_up = asyncio.create_task(_warm_up_tanah_store())
+    yield
+    if warm_up:
+        warm_up.cancel()
 
-from src.config import Args, Content, Logo
-from src.core import from_str, create_bookmark
-from src.input_generator import HebrewCalendar
-from src.output_generators import write_html, write_svgs
-from src.utils import convert_date, get_simhat_tora_by
 
 app = FastAPI(
     title="Daily Bookmark Generator",
     description="Generate bookmark files for daily learning.",
+    lifespan=lifespan,
 )
 
 origins = [
@@ -33,20 +98,110 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Pages"],
 )
 
+if metrics.enabled:
+
+    @app.middleware("http")
+    async def request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        metrics.observe(
+            "request_seconds",
+            time.perf_counter() - start,
+            path=route.path if route else "unmatched",
+            status=str(response.status_code),
+        )
+        return response
+
+
+@metrics.collector
+def render_pool_samples():
+    stats = render_pool.stats()
+    yield "render_jobs", "gauge", {"state": "running"}, stats["running"]
+    yield "render_jobs", "gauge", {"state": "waiting"}, stats["waiting"]
+    yield "render_jobs_total", "counter", {"result": "completed"}, stats["completed"]
+    yield "render_jobs_total", "counter", {"result": "rejected"}, stats["rejected"]
+
+
+@metrics.collector
+def stage_cache_samples():
+    for name, stage in STAGES.items():
+        info = stage.cache_info()
+        yield "stage_cache_total", "counter", {"stage": name, "result": "hit"}, info.hits
+        yield "stage_cache_total", "counter", {"stage": name, "result": "miss"}, info.misses
+
+
 @app.get("/", include_in_schema=False)
 async def root():
     return RedirectResponse("/docs")
 
 
+@app.exception_handler(RenderPoolFull)
+async def render_pool_full(request: Request, exc: RenderPoolFull):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many bookmarks are being rendered, try again later"},
+        headers={"Retry-After": "5"},
+    )
+
+
+@app.exception_handler(CsvTooLarge)
+async def csv_too_large(request: Request, exc: CsvTooLarge):
+    return JSONResponse(status_code=413, content={"detail": exc.args[0]})
+
+
+@app.exception_handler(CsvInvalid)
+async def csv_invalid(request: Request, exc: CsvInvalid):
+    return JSONResponse(status_code=400, content={"detail": exc.args[0]})
+
+
+@app.exception_handler(PageNotFound)
+async def page_not_found(request: Request, exc: PageNotFound):
+    return JSONResponse(status_code=404, content={"detail": exc.args[0]})
+
+
+async def _csv_source(csv_file: UploadFile) -> CsvSource:
+    """
+    Render threads read the upload lazily from its spooled file,
+    worker processes can only get its content.
+    """
+    if render_pool.kind == "thread":
+        check_upload_size(csv_file)
+        return csv_file.file
+    return await read_upload(csv_file)
+
+
 @app.get("/health", include_in_schema=False)
 async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/health/render", include_in_schema=False)
+async def render_stats():
+    return render_pool.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled, set BOOKMARKER_METRICS=1")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+tanah_cache = ContentCache(
+    "tanah_yomi",
+    max_bytes=int(os.environ.get("BOOKMARKER_CACHE_BYTES", 64 * 2**20)),
+    directory=os.environ.get("BOOKMARKER_CACHE_DIR"),
+    max_disk_bytes=int(os.environ.get("BOOKMARKER_CACHE_DISK_BYTES", 512 * 2**20)),
+)
+
+
 @app.get("/bookmarker/tanah_yomi")
 async def gen_tanah_htmlpage(
+    request: Request,
     year: str = Query(
         ...,
         description="Hebrew year (in the format of התשפה, or just תשפה with default 5000)",
@@ -60,128 +215,118 @@ async def gen_tanah_htmlpage(
         simhas_torah_dates = get_simhat_tora_by(year)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=exc.args[0])
-    
-    calendar = HebrewCalendar(
-        *simhas_torah_dates,
-        major_holidays=True,
-        minor_holidays=False,
-        extra_holidays=True,
-    )
 
-    days = calendar.learning_days(shabbos=True)
-    if days < 293:
-        raise HTTPException(
-            status_code=404, detail="Tanah Yomi Seder doesn't fits calender days"
-        )
-    if days > 297:
-        days = 297
-
-    csv_decoded = Path(f"examples/tanah_yomi_{days}.csv").read_text(encoding="utf-8")
-    chapters_lines = csv_decoded.splitlines()
-    full_bookmark = calendar.generate_csv(
-        iter(chapters_lines),
-        shabbos=True,
-        bold=True,
-    )
+    try:
+        config = PageConfig(Size(width, height), font)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=exc.args[0])
+    # the page size as rendered, larger sizes are limited to A4 and share its entry
+    width, height = config.size_cm.width, config.size_cm.height
+    key = (simhas_torah_dates[0].year, width, height, font)
+    # the store and the disk tier of the cache read files, off the event loop
+    artifact = await run_in_threadpool(tanah_store.get, artifact_name(*key)) if tanah_store else None
+    if artifact is not None and accepts_gzip(request):
+        metrics.inc("tanah_cache_total", result="artifact")
+        return gzip_file_response(artifact, request, media_type="text/html")
 
-    y = simhas_torah_dates[0].hebrew_year(True, True)
-    logo = base64.b64encode(Path("images/TanachLogo.png").read_bytes()).decode("utf-8")
-
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        title = f'לוח תנ"ך יומי - {y}'
-        args = Args(
-            input=full_bookmark,
-            out=tmpdirname,
-            width=width,
-            height=height,
-            font_size=font,
-            printer=write_html,
-        )
-        content = Content(
-            title=title, 
-            subtitle='לימוד כל התנ"ך בשנה אחת - עפ"י חלוקת המסורה',
-            url="www.tanachyomi.co.il",
-            logo=Logo(content_type="image/png", base64_data=logo),
-        )
-        create_bookmark(args, content)
-        html = (Path(tmpdirname) / "bookmarks.html").read_text(encoding="utf-8")
-        return HTMLResponse(html)
+    cached = await run_in_threadpool(tanah_cache.get, key)
+    metrics.inc("tanah_cache_total", result="miss" if cached is None else "hit")
+    if cached is None and artifact is not None:
+        body = await run_in_threadpool(lambda: gzip.decompress(artifact.path.read_bytes()))
+        cached = await run_in_threadpool(tanah_cache.put, key, body)
+    elif cached is None:
+        try:
+            html = await render_pool.run(render_tanah_yomi, simhas_torah_dates, width, height, font)
+        except SederMismatch as exc:
+            raise HTTPException(status_code=404, detail=exc.args[0])
+        cached = await run_in_threadpool(tanah_cache.put, key, html.encode("utf-8"))
+    return cached_response(cached, request, media_type="text/html")
+
+
+async def _calendar_bookmark(
+    printer: Callable, options: CalendarOptions, csv_file: UploadFile | list[Schedule], logo: UploadFile | None
+) -> Any:
+    if isinstance(csv_file, list):
+        job, source = schedule_bookmark, csv_file
+    else:
+        job, source = calendar_bookmark, await _csv_source(csv_file)
+
+    encoded_logo = None
+    if logo:
+        content = await logo.read()
+        encoded_logo = Logo(logo.content_type, base64.b64encode(content).decode("utf-8"))
+    return await render_pool.run(job, printer, source, options, encoded_logo)
 
 
 @app.post("/bookmarker/html")
 async def generate_html(
-    start_date: datetime.date = Query(
-        ...,
-        description="Start date (in the format of 2024-10-03)",
-        examples=["2024-10-03"],
-    ),
-    end_date: datetime.date | None = Query(
-        None,
-        description="End date, inclusive (default to 1 hebrew year)",
-        examples=[None, "2025-09-22"],
-    ),
+    options: CalendarOptions = Depends(),
     csv_file: UploadFile = File(..., description="CSV file with chapters (single column)"),
-    title: str = Query("Title", description="Title"),
-    subtitle: str | None = Query(None, description="Sub Title"),
     logo: UploadFile | None = None,
-    url: str|None = Query(None, description="Link on the bookmark"),
-    width: float = Query(10, description="Bookmark width (cm)"),
-    height: float = Query(15, description="Bookmark height (cm)"),
-    font: float = Query(12, description="Font size"),
-    shabbos: bool = Query(True, description="Do not schedule learning on Shabbos"),
-    major_holidays: bool = Query(
-        True, description="Do not schedule learning on non-working holidays"
-    ),
-    minor_holidays: bool = Query(
-        False,
-        description="Do not schedule learning on working holidays (Hanuka, Hol Hamoed, etc.)",
-    ),
-    extra_holidays: bool = Query(
-        True,
-        description="Do not schedule learning on Purim, Tishaa Beav and Yom Haatzmaut",
-    ),
-    bold: bool = Query(True, description="Bold Shabbos or any non-learning day"),
 ):
-    csv_content = await csv_file.read()
-    csv_decoded = csv_content.decode("utf-8")
-    chapters_lines = csv_decoded.splitlines()
-    bookmark_csv = HebrewCalendar(
-        *convert_date(start_date, end_date),
-        major_holidays=major_holidays,
-        minor_holidays=minor_holidays,
-        extra_holidays=extra_holidays,
-    ).generate_csv(
-        iter(chapters_lines),
-        shabbos=shabbos,
-        bold=bold,
+    pages = await _calendar_bookmark(keep, options, csv_file, logo)
+    return StreamingResponse(
+        document(pages),
+        media_type="text/html",
+        headers={"Content-Disposition": "attachment; filename=bookmarks.html"},
     )
 
-    encoded_logo = None
-    if logo:
-        content = await logo.read()
-        encoded_logo = Logo(logo.content_type, base64.b64encode(content).decode("utf-8"))
-    
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        args = Args(
-            input=bookmark_csv,
-            out=tmpdirname,
-            width=width,
-            height=height,
-            font_size=font,
-            printer=write_html,
-        )
-        content = Content(
-            title=title, 
-            subtitle=subtitle,
-            url=url,
-            logo=encoded_logo,
-        )
-        create_bookmark(args ,content)
-        return StreamingResponse(
-            StringIO((Path(tmpdirname) / "bookmarks.html").read_text(encoding="utf-8")),
-            media_type="text/html",
-            headers={"Content-Disposition": "attachment; filename=bookmarks.html"},
-        )
+
+@app.post("/bookmarker/preview")
+async def generate_preview(
+    page: int = Query(1, ge=1, description="Bookmark page, from 1"),
+    options: CalendarOptions = Depends(),
+    csv_file: UploadFile = File(..., description="CSV file with chapters (single column)"),
+    logo: UploadFile | None = None,
+):
+    """
+    One page of the /bookmarker/html bookmarks as an svg, for a live preview.
+    The number of pages is in the X-Total-Pages header.
+    """
+    svg, total_pages = await _calendar_bookmark(partial(preview_page, page), options, csv_file, logo)
+    return Response(svg, media_type="image/svg+xml", headers={"X-Total-Pages": str(total_pages)})
+
+
+@app.post("/bookmarker/pdf")
+async def generate_pdf(
+    request: Request,
+    options: CalendarOptions = Depends(),
+    csv_file: UploadFile = File(..., description="CSV file with chapters (single column)"),
+    logo: UploadFile | None = None,
+):
+    html = await _calendar_bookmark(html_document, options, csv_file, logo)
+    try:
+        with metrics.stage("pdf"):
+            pdf = await render_pdf(html)
+    except PdfUnavailable:
+        raise HTTPException(status_code=503, detail="PDF rendering is not available")
+
+    response = cached_response(pdf, request, media_type="application/pdf")
+    response.headers["Content-Disposition"] = "attachment; filename=bookmarks.pdf"
+    return response
+
+
+@app.post("/bookmarker/schedule")
+async def generate_schedule_html(
+    options: CalendarOptions = Depends(),
+    schedule: str = Form(
+        ...,
+        description="JSON response of the scheduler's /schedule, a label per day instead of a CSV",
+        examples=['[{"book": "Berakhot", "schedule": [{"chapter": 1, "section": 2}, {"chapter": 1, "section": 4}]}]'],
+    ),
+    logo: UploadFile | None = None,
+):
+    try:
+        schedules = TypeAdapter(list[Schedule]).validate_json(schedule)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=json.loads(exc.json(include_url=False)))
+
+    pages = await _calendar_bookmark(keep, options, schedules, logo)
+    return StreamingResponse(
+        document(pages),
+        media_type="text/html",
+        headers={"Content-Disposition": "attachment; filename=bookmarks.html"},
+    )
 
 
 @app.post("/bookmarker/svgs")
@@ -195,39 +340,56 @@ async def generate_svgs(
     logo: UploadFile | None = None,
     url: str|None = Query(None, description="Link on the bookmark"),
 ):
-    csv_content = await csv_file.read()
-    csv_decoded = csv_content.decode("utf-8")
+    csv_source = await _csv_source(csv_file)
 
     encoded_logo = None
     if logo:
         content = await logo.read()
         encoded_logo = Logo(logo.content_type, base64.b64encode(content).decode("utf-8"))
-    
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        args = Args(
-            input=from_str(csv_decoded),
-            out=tmpdirname,
-            width=width,
-            height=height,
-            font_size=font,
-            printer=write_svgs,
-        )
-        content = Content(
-            title=title, 
-            subtitle=subtitle,
-            url=url,
-            logo=encoded_logo,
+
+    content = Content(
+        title=title,
+        subtitle=subtitle,
+        url=url,
+        logo=encoded_logo,
+    )
+    svgs_zip = await render_pool.run(csv_bookmark, render_svgs_zip, csv_source, content, width, height, font)
+    if svgs_zip:
+        return Response(
+            svgs_zip,
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=bookmarks.zip"},
         )
-        create_bookmark(args, content)
-        zip_path = Path(tmpdirname) / "bookmarks.zip"
-        svg_files = list(Path(tmpdirname).glob("*.svg"))
-        if svg_files:
-            shutil.make_archive(str(zip_path.with_suffix("")), "zip", tmpdirname)
-            return StreamingResponse(
-                BytesIO(zip_path.read_bytes()),
-                media_type="application/zip",
-                headers={"Content-Disposition": "attachment; filename=bookmarks.zip"},
-            )
+
+@app.post("/bookmarker/batch")
+async def generate_batch(
+    csv_file: UploadFile = File(..., description="CSV file with chapters (single column), shared by all jobs"),
+    jobs: str = Form(
+        ...,
+        description="JSON list of bookmarks, each with the options of /bookmarker/html and an output of html or svgs",
+        examples=['[{"start_date": "2024-10-03", "width": 10}, {"start_date": "2024-10-03", "width": 5, "output": "svgs"}]'],
+    ),
+    logo: UploadFile | None = None,
+):
+    try:
+        job_list = TypeAdapter(list[BookmarkJob]).validate_json(jobs)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=json.loads(exc.json(include_url=False)))
+    if not job_list or len(job_list) > MAX_BATCH_JOBS:
+        raise HTTPException(status_code=422, detail=f"A batch holds 1 to {MAX_BATCH_JOBS} jobs")
+
+    csv_content = await read_upload(csv_file)
+
+    encoded_logo = None
+    if logo:
+        content = await logo.read()
+        encoded_logo = Logo(logo.content_type, base64.b64encode(content).decode("utf-8"))
+
+    return Response(
+        await render_batch(job_list, csv_content, encoded_logo),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=bookmarks.zip"},
+    )
 
 def start_service():
     import uvicorn
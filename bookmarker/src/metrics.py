@@ -0,0 +1,164 @@
+"""
+Optional latency histograms and counters, exported on /metrics in the
+Prometheus text format. Enabled by BOOKMARKER_METRICS=1, when disabled
+timers are a shared no-op and nothing is recorded.
+With BOOKMARKER_EXECUTOR=process the stages run in worker processes,
+and only what the web process measures is exported.
+"""
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, type, labels, value) of a sample read when /metrics is scraped
+Sample = tuple[str, str, dict[str, str], float]
+
+
+def size_class(n: int) -> str:
+    """Request size as a label of few values: the power of 10 at or above n"""
+    bound = 1
+    while bound < n:
+        bound *= 10
+    return str(bound)
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    values = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return f"{{{values}}}"
+
+
+class _Timer:
+    __slots__ = ("metrics", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", labels: dict[str, str]) -> None:
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.metrics.observe("stage_seconds", time.perf_counter() - self.start, **self.labels)
+
+    def label(self, **labels) -> None:
+        """Labels known only once the stage ran, like the size of its output"""
+        self.labels.update(labels)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def label(self, **labels) -> None:
+        pass
+
+
+_DISABLED = _NoTimer()
+
+
+class Metrics:
+    def __init__(self, prefix: str, enabled: bool) -> None:
+        self.prefix = prefix
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: dict[str, dict[tuple, list[float]]] = {}
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._collectors: list[Callable[[], Iterable[Sample]]] = []
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if (histogram := series.get(key)) is None:
+                histogram = series[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def stage(self, stage: str, **labels) -> _Timer | _NoTimer:
+        """Context manager timing a stage into the stage_seconds histogram"""
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, {"stage": stage, **labels})
+
+    def timed(self, iterable: Iterable, stage: str, **labels) -> Iterator:
+        """
+        Iterate, timing only the work of the iterator, not of its consumer.
+        Recorded also when the consumer stops early, like a lazy csv reader.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+        spent = 0.0
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    spent += time.perf_counter() - start
+                yield item
+        finally:
+            self.observe("stage_seconds", spent, stage=stage, **labels)
+
+    def collector(self, collect: Callable[[], Iterable[Sample]]) -> Callable[[], Iterable[Sample]]:
+        """Register a function read on every scrape, usable as a decorator"""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, histogram in series.items():
+                    labels = dict(key)
+                    for bound, count in zip((*BUCKETS, "+Inf"), (*histogram[: len(BUCKETS)], histogram[-1])):
+                        lines.append(f"{full_name}_bucket{_labels({**labels, 'le': bound})} {count}")
+                    lines.append(f"{full_name}_sum{_labels(labels)} {histogram[-2]}")
+                    lines.append(f"{full_name}_count{_labels(labels)} {histogram[-1]}")
+            for name, series in self._counters.items():
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in series.items():
+                    lines.append(f"{full_name}{_labels(dict(key))} {value}")
+
+        typed = set()
+        for collect in self._collectors:
+            for name, kind, labels, value in collect():
+                full_name = f"{self.prefix}_{name}"
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f"# TYPE {full_name} {kind}")
+                lines.append(f"{full_name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics("bookmarker", os.environ.get("BOOKMARKER_METRICS", "0").lower() in ("1", "true", "yes"))
@@ -1,11 +1,16 @@
 import math
+import zipfile
+from io import BytesIO
+from itertools import islice
 from pathlib import Path
+from typing import Iterable, Iterator
 
-from src.config import PageConfig, Size, Content
-from src.svg_generator import TableGenerator, PageGenerator, SvgConfig
+from src.config import PageConfig, Row, Size, Content
+from src.metrics import metrics, size_class
+from src.svg_generator import TableGenerator, PageTemplate, SvgConfig
 
 
-def make_bookmark_svgs(data: Content, tables: list[TableGenerator], config: PageConfig) -> list[str]:
+def page_template(data: Content, config: PageConfig, idx: list[Row], shared_defs: bool = False) -> PageTemplate:
     conf = SvgConfig(
         page_config=config,
         title_offset=30,
@@ -14,24 +19,61 @@ def make_bookmark_svgs(data: Content, tables: list[TableGenerator], config: Page
         footer_margin=12,
         qr_size=35,
     )
-    return [PageGenerator(conf, data.title, data.subtitle, data.url, data.logo, table).build() for table in tables]
+    return PageTemplate(conf, data.title, data.subtitle, data.url, data.logo, idx, shared_defs)
+
+
+def iter_bookmark_svgs(data: Content, tables: list[TableGenerator], config: PageConfig, template: PageTemplate | None = None) -> Iterator[str]:
+    if not tables:
+        return
+    template = template or page_template(data, config, tables[0].idx)
+    for table in tables:
+        yield template.fill(table)
+
+
+def make_bookmark_svgs(data: Content, tables: list[TableGenerator], config: PageConfig) -> list[str]:
+    return list(iter_bookmark_svgs(data, tables, config))
+
+
+def render_svgs(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str | None = None) -> list[bytes]:
+    with metrics.stage("svg_render", pages=size_class(len(bookmarks))):
+        return [page.encode("utf8") for page in make_bookmark_svgs(data, bookmarks, config)]
 
 
 def write_svgs(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str) -> None:
-    pages = make_bookmark_svgs(data, bookmarks, config)
+    pages = render_svgs(data, bookmarks, config)
     out_dir = Path(out_dir_str)
     out_dir.mkdir(exist_ok=True)
 
     for i, page in enumerate(pages, 1):
-        with Path(out_dir / f"bookmark{i}.svg").open("w", encoding="utf8") as file:
-            file.write(page)
+        Path(out_dir / f"bookmark{i}.svg").write_bytes(page)
+
+
+def render_svgs_zip(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str | None = None) -> bytes | None:
+    pages = render_svgs(data, bookmarks, config)
+    if pages:
+        return zip_svgs(pages)
+    return None
+
+
+def zip_svgs(pages: list[bytes]) -> bytes:
+    buf = BytesIO()
+    with metrics.stage("zip", pages=size_class(len(pages))):
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+            for i, page in enumerate(pages, 1):
+                archive.writestr(f"bookmark{i}.svg", page)
+    return buf.getvalue()
 
 def custom_round(num: float) -> int:
     if abs(num - int(num)) >= 0.95:
         return math.ceil(num)
     return math.floor(num)
 
-def make_printable_html(bookmarks: list[str], conf: PageConfig) -> str:
+def iter_printable_html(bookmarks: Iterable[str], conf: PageConfig, defs: str = "") -> Iterator[str]:
+    """
+    Yield the printable html document piece by piece: the head, then every
+    A4 sheet row by row, pulling bookmarks from the iterable as it goes.
+    defs -- svg definitions shared by the bookmarks (see PageTemplate)
+    """
     orientation = "Landscape"
     A4 = Size(width=29.7, height=21)
     if conf.size_cm.height > A4.height:
@@ -40,27 +82,8 @@ def make_printable_html(bookmarks: list[str], conf: PageConfig) -> str:
 
     repeat_in_row = custom_round(A4.width / conf.size_cm.width)
     repeat_in_col = custom_round(A4.height / conf.size_cm.height)
-    total_in_page = repeat_in_row * repeat_in_col
-
-    pages = [
-        bookmarks[i : i + total_in_page]
-        for i in range(0, len(bookmarks), total_in_page)
-    ]
-    pages_html = '\n<div class="page-break"></div>\n'.join(
-        [
-            "\n".join(
-                [
-                    '<div class="svg-container">{}</div>'.format(
-                        "\n".join(reversed(page[i : i + repeat_in_row]))
-                    )
-                    for i in range(0, total_in_page, repeat_in_row)
-                ]
-            )
-            for page in pages
-        ]
-    )
 
-    return f"""
+    yield f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -96,14 +119,45 @@ def make_printable_html(bookmarks: list[str], conf: PageConfig) -> str:
             </style>
         </head>
         <body>
-            {pages_html}
+            """
+    yield defs
+
+    bookmarks = iter(bookmarks)
+    first_page = True
+    while row := list(islice(bookmarks, repeat_in_row)):
+        if not first_page:
+            yield '\n<div class="page-break"></div>\n'
+        first_page = False
+        for i in range(repeat_in_col):
+            if i:
+                row = list(islice(bookmarks, repeat_in_row))
+                yield "\n"
+            # bookmarks are laid right to left
+            yield '<div class="svg-container">'
+            yield "\n".join(reversed(row))
+            yield "</div>"
+
+    yield """
         </body>
         </html>
     """
 
 
+def stream_html(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str | None = None) -> Iterator[str]:
+    idx = bookmarks[0].idx if bookmarks else []
+    template = page_template(data, config, idx, shared_defs=True)
+    pages = size_class(len(bookmarks))
+    svgs = metrics.timed(iter_bookmark_svgs(data, bookmarks, config, template), "svg_render", pages=pages)
+    # the html stage includes rendering the svgs it pulls
+    return metrics.timed(iter_printable_html(svgs, config, template.defs), "html", pages=pages)
+
+
+def render_html(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str | None = None) -> str:
+    return "".join(stream_html(data, bookmarks, config))
+
+
 def write_html(data: Content, bookmarks: list[TableGenerator], config: PageConfig, out_dir_str: str) -> None:
-    html = make_printable_html(make_bookmark_svgs(data, bookmarks, config), config)
+    html = render_html(data, bookmarks, config)
     out_dir = Path(out_dir_str)
     out_dir.mkdir(exist_ok=True)
 
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.cache import CachedContent, ContentCache
+
+try:
+    import pdfkit
+except ImportError:  # optional, needs the wkhtmltopdf binary as well
+    pdfkit = None
+
+
+class PdfUnavailable(Exception):
+    pass
+
+
+# wkhtmltopdf runs as a subprocess, threads are enough to keep it off the event loop
+pdf_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("BOOKMARKER_PDF_WORKERS", 2)),
+    thread_name_prefix="pdf",
+)
+
+pdf_cache = ContentCache(
+    "pdf",
+    max_bytes=int(os.environ.get("BOOKMARKER_PDF_CACHE_BYTES", 64 * 2**20)),
+    directory=os.environ.get("BOOKMARKER_CACHE_DIR"),
+    max_disk_bytes=int(os.environ.get("BOOKMARKER_CACHE_DISK_BYTES", 512 * 2**20)),
+)
+
+
+def html_to_pdf(html: str) -> bytes:
+    """
+    Print the html of iter_printable_html to pdf. Page size, orientation and
+    margins come from its pdfkit-* meta tags.
+    """
+    if pdfkit is None:
+        raise PdfUnavailable("pdfkit is not installed")
+    try:
+        return pdfkit.from_string(html, False, options={"quiet": ""})
+    except OSError as exc:
+        raise PdfUnavailable(str(exc)) from exc
+
+
+def _cached_pdf(html: str) -> tuple[str, CachedContent | None]:
+    key = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    return key, pdf_cache.get(key)
+
+
+async def render_pdf(html: str) -> CachedContent:
+    # hashing megabytes of html and the disk tier block, off the event loop
+    key, cached = await run_in_threadpool(_cached_pdf, html)
+    if cached is not None:
+        return cached
+    pdf = await asyncio.get_running_loop().run_in_executor(pdf_pool, html_to_pdf, html)
+    return await run_in_threadpool(pdf_cache.put, key, pdf)
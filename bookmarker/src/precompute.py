@@ -0,0 +1,105 @@
+"""
+Tanah Yomi bookmarks rendered ahead of time, for a window of Hebrew years
+and the popular page presets, into a store of gzipped html files that
+/bookmarker/tanah_yomi serves from disk. Other parameters are rendered live.
+
+    cd bookmarker && python -m src.precompute --directory build/tanah_yomi
+    cd bookmarker && python -m src.precompute --directory build/tanah_yomi --years 5 --preset 10x15x12
+
+Run it in the build step, or let the service fill the missing files in the
+background at startup (BOOKMARKER_TANAH_WARMUP=1).
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from pyluach.dates import HebrewDate
+
+from src.cache import ArtifactStore
+from src.render import SederMismatch, render_tanah_yomi
+from src.utils import simhat_tora_year
+
+
+class Preset(NamedTuple):
+    width: float
+    height: float
+    font: float
+
+
+def parse_preset(text: str) -> Preset:
+    """A preset as widthxheightxfont, like 10x15x12"""
+    try:
+        width, height, font = map(float, text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Not a widthxheightxfont preset: {text!r}")
+    return Preset(width, height, font)
+
+
+TANAH_DIR = os.environ.get("BOOKMARKER_TANAH_DIR")
+TANAH_YEARS = int(os.environ.get("BOOKMARKER_TANAH_YEARS", 3))
+# the defaults of the front end and of the api
+TANAH_PRESETS = [
+    parse_preset(preset) for preset in os.environ.get("BOOKMARKER_TANAH_PRESETS", "21x29.7x15.7,10x15x12").split(",")
+]
+
+
+def artifact_name(year: int, width: float, height: float, font: float) -> str:
+    return f"tanah_yomi-{year}-{width:g}x{height:g}-f{font:g}.html"
+
+
+def upcoming_years(count: int, first: int | None = None) -> range:
+    """The Hebrew years of the window, by default from last year on, like the front end offers"""
+    if first is None:
+        first = HebrewDate.today().year - 1
+    return range(first, first + count)
+
+
+def render_artifact(directory: str, year: int, preset: Preset) -> str | None:
+    """Render one bookmark into the store, None if the Seder doesn't fit that year"""
+    try:
+        html = render_tanah_yomi(simhat_tora_year(year), *preset)
+    except SederMismatch:
+        return None
+    name = artifact_name(year, *preset)
+    ArtifactStore(directory).put(name, html.encode("utf-8"))
+    return name
+
+
+def missing(store: ArtifactStore, years: range, presets: list[Preset]) -> list[tuple[int, Preset]]:
+    return [
+        (year, preset) for year in years for preset in presets if store.get(artifact_name(year, *preset)) is None
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--directory", default=TANAH_DIR, required=TANAH_DIR is None, help="the artifact store")
+    parser.add_argument("--years", type=int, default=TANAH_YEARS, help="number of Hebrew years")
+    parser.add_argument("--first-year", type=int, help="first Hebrew year, as a number (default last year)")
+    parser.add_argument(
+        "--preset", type=parse_preset, action="append", help="widthxheightxfont, can be repeated"
+    )
+    parser.add_argument("--force", action="store_true", help="render again files already in the store")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="rendering processes")
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.directory)
+    years = upcoming_years(args.years, args.first_year)
+    presets = args.preset or TANAH_PRESETS
+    todo = [(year, preset) for year in years for preset in presets] if args.force else missing(store, years, presets)
+
+    rendered = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(render_artifact, args.directory, year, preset) for year, preset in todo]
+        for (year, preset), future in zip(todo, futures):
+            if name := future.result():
+                rendered += 1
+                print(name)
+            else:
+                print(f"{year} {preset}: the Seder doesn't fit the calendar, skipped")
+    print(f"{rendered} rendered, {len(years) * len(presets) - len(todo)} already in {store.directory}")
+
+
+if __name__ == "__main__":
+    main()
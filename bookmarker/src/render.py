@@ -0,0 +1,158 @@
+"""
+Synchronous rendering jobs, run by the render pool (see executor.py).
+Jobs and their arguments stay picklable so they can run in worker processes.
+"""
+import base64
+import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from pyluach.dates import HebrewDate
+
+from src.config import Args, CalendarOptions, Content, Logo, Row
+from src.core import create_bookmark
+from src.ingest import CsvSource, iter_chapters, iter_rows
+from src.input_generator import HebrewCalendar
+from src.metrics import metrics, size_class
+from src.output_generators import render_html
+from src.schedule import Schedule, iter_labels
+from src.stages import calendar, content_key, read_chapters
+from src.utils import convert_date
+
+
+class SederMismatch(Exception):
+    pass
+
+
+@lru_cache(maxsize=8)
+def _tanah_chapters(days: int) -> tuple[str, ...]:
+    csv_decoded = Path(f"examples/tanah_yomi_{days}.csv").read_text(encoding="utf-8")
+    return tuple(csv_decoded.splitlines())
+
+
+@lru_cache(maxsize=1)
+def _tanah_logo() -> Logo:
+    logo = base64.b64encode(Path("images/TanachLogo.png").read_bytes()).decode("utf-8")
+    return Logo(content_type="image/png", base64_data=logo)
+
+
+def render_tanah_yomi(
+    simhas_torah_dates: tuple[HebrewDate, HebrewDate], width: float, height: float, font: float
+) -> str:
+    calendar = HebrewCalendar(
+        *simhas_torah_dates,
+        major_holidays=True,
+        minor_holidays=False,
+        extra_holidays=True,
+    )
+
+    days = calendar.learning_days(shabbos=True)
+    if days < 293:
+        raise SederMismatch("Tanah Yomi Seder doesn't fits calender days")
+    if days > 297:
+        days = 297
+
+    with metrics.stage("rows") as stage:
+        full_bookmark = calendar.generate_csv(
+            iter(_tanah_chapters(days)),
+            shabbos=True,
+            bold=True,
+        )
+        stage.label(rows=size_class(len(full_bookmark)))
+
+    y = simhas_torah_dates[0].hebrew_year(True, True)
+
+    title = f'לוח תנ"ך יומי - {y}'
+    args = Args(
+        input=full_bookmark,
+        out=None,
+        width=width,
+        height=height,
+        font_size=font,
+        printer=render_html,
+    )
+    content = Content(
+        title=title, 
+        subtitle='לימוד כל התנ"ך בשנה אחת - עפ"י חלוקת המסורה',
+        url="www.tanachyomi.co.il",
+        logo=_tanah_logo(),
+    )
+    return create_bookmark(args, content)
+
+
+def _chapters_bookmark(printer: Callable, chapters: Iterator[str], options: CalendarOptions, logo: Logo | None) -> Any:
+    """Bookmark through the cached stages (see stages.py), the printer gets the keys of its layout and content"""
+    calendar_key = options.calendar_key()
+    used = read_chapters(chapters, calendar(calendar_key).learning_days(options.shabbos))
+    rows_key = (calendar_key, used, options.shabbos, options.bold)
+    try:
+        return printer((rows_key, options.width, options.height, options.font), content_key(options.content(logo)))
+    finally:
+        used.release()
+
+
+def calendar_bookmark(printer: Callable, csv_source: CsvSource, options: CalendarOptions, logo: Logo | None) -> Any:
+    """Bookmark of the chapters csv laid on the calendar"""
+    return _chapters_bookmark(printer, iter_chapters(csv_source), options, logo)
+
+
+def schedule_bookmark(printer: Callable, schedules: list[Schedule], options: CalendarOptions, logo: Logo | None) -> Any:
+    """Bookmark of schedules of the scheduler service laid on the calendar, a label per day"""
+    return _chapters_bookmark(printer, iter_labels(schedules), options, logo)
+
+
+# (start_date, end_date, major_holidays, minor_holidays, extra_holidays, shabbos, bold)
+CalendarKey = tuple[datetime.date, datetime.date | None, bool, bool, bool, bool, bool]
+
+
+def calendar_rows(csv_source: CsvSource, keys: list[CalendarKey]) -> dict[CalendarKey, list[Row]]:
+    """Merge the chapters csv into every calendar, parsing it and building each calendar once"""
+    chapters_lines = list(iter_chapters(csv_source))
+    calendars = {}
+    rows = {}
+    for key in keys:
+        start_date, end_date, major_holidays, minor_holidays, extra_holidays, shabbos, bold = key
+        calendar_key = key[:5]
+        if calendar_key not in calendars:
+            calendars[calendar_key] = HebrewCalendar(
+                *convert_date(start_date, end_date),
+                major_holidays=major_holidays,
+                minor_holidays=minor_holidays,
+                extra_holidays=extra_holidays,
+            )
+        if key not in rows:
+            rows[key] = calendars[calendar_key].generate_csv(
+                iter(chapters_lines),
+                shabbos=shabbos,
+                bold=bold,
+            )
+    return rows
+
+
+def rows_bookmark(
+    printer: Callable, rows: list[Row], content: Content, width: float, height: float, font: float
+) -> Any:
+    args = Args(
+        input=rows,
+        out=None,
+        width=width,
+        height=height,
+        font_size=font,
+        printer=printer,
+    )
+    return create_bookmark(args, content)
+
+
+def csv_bookmark(
+    printer: Callable, csv_source: CsvSource, content: Content, width: float, height: float, font: float
+) -> Any:
+    args = Args(
+        input=list(iter_rows(csv_source)),
+        out=None,
+        width=width,
+        height=height,
+        font_size=font,
+        printer=printer,
+    )
+    return create_bookmark(args, content)
@@ -0,0 +1,38 @@
+"""
+Learning schedules of the scheduler service, as returned by its /schedule
+endpoint, turned into the daily labels of a bookmark.
+"""
+from typing import Iterable, Iterator
+
+from pydantic import BaseModel
+
+
+class ScheduledBookmark(BaseModel):
+    """Where a day of learning ends, a SectionsBookmark or a PageBookmark"""
+
+    section: int | None = None
+    chapter: int | None = None
+    part: int | None = None
+    page: int | None = None
+    amud: str | None = None
+    book: str | None = None
+
+
+class Schedule(BaseModel):
+    schedule: list[ScheduledBookmark]
+    book: str
+
+
+def bookmark_label(bookmark: ScheduledBookmark, book: str) -> str:
+    book = bookmark.book or book
+    if bookmark.page is not None:
+        return f"{book} {bookmark.page}{bookmark.amud or ''}"
+    position = ":".join(str(n) for n in (bookmark.chapter, bookmark.section) if n is not None)
+    return f"{book} {position}".strip()
+
+
+def iter_labels(schedules: Iterable[Schedule]) -> Iterator[str]:
+    """A label per day, the schedules learned one after the other"""
+    for schedule in schedules:
+        for bookmark in schedule.schedule:
+            yield bookmark_label(bookmark, schedule.book)
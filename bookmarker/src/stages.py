@@ -0,0 +1,174 @@
+"""
+The calendar bookmark pipeline as cached stages, each keyed by the inputs
+it depends on: calendar days -> merged rows -> layout -> svg pages -> document.
+Changing only the title, subtitle, url or logo renders the pages again from
+the cached layout, changing only the page size or font lays out the cached
+rows again. The pages are rendered while the document streams, one at a
+time, so they are not cached. A preview lays out and renders a single page
+of the rows, without the others.
+Only the chapters the calendar uses are read, and keys hold their digest.
+Every stage keeps at most BOOKMARKER_STAGE_BYTES of results, estimated by
+their text. Caches are per process, with BOOKMARKER_EXECUTOR=process every
+worker has its own.
+"""
+import datetime
+import hashlib
+import math
+import os
+from itertools import islice
+from typing import Iterator, NamedTuple
+
+from src.cache import sized_cache
+from src.config import Content, Logo, PageConfig, Row, Size
+from src.input_generator import HebrewCalendar
+from src.metrics import metrics, size_class
+from src.output_generators import page_template, stream_html
+from src.svg_generator import TableGenerator, get_svg_table, get_svg_tables
+from src.utils import convert_date, get_idx, page_rows
+
+STAGE_BYTES = int(os.environ.get("BOOKMARKER_STAGE_BYTES", 32 * 2**20))
+DAY_BYTES = 100  # a calendar day, its date and holiday
+
+# (start_date, end_date, major_holidays, minor_holidays, extra_holidays)
+CalendarKey = tuple[datetime.date, datetime.date | None, bool, bool, bool]
+
+
+class Chapters:
+    """
+    The chapters of a bookmark, equal when their digests are. The chapters
+    themselves are read only by the rows stage, and dropped by release(),
+    so the keys the stage caches keep are of constant size.
+    """
+
+    __slots__ = ("digest", "items")
+
+    def __init__(self, items: tuple[str, ...], digest: bytes) -> None:
+        self.items = items
+        self.digest = digest
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Chapters) and self.digest == other.digest
+
+    def release(self) -> None:
+        self.items = ()
+
+
+def read_chapters(chapters: Iterator[str], count: int) -> Chapters:
+    """The first `count` chapters, the rest of the source is never read"""
+    items = tuple(islice(chapters, count))
+    digest = hashlib.blake2b(digest_size=16)
+    for chapter in items:
+        data = chapter.encode("utf-8")
+        digest.update(len(data).to_bytes(4, "little"))
+        digest.update(data)
+    return Chapters(items, digest.digest())
+
+
+# (calendar, chapters, shabbos, bold)
+RowsKey = tuple[CalendarKey, Chapters, bool, bool]
+# (rows, width, height, font)
+LayoutKey = tuple[RowsKey, float, float, float]
+# (title, subtitle, url, logo)
+ContentKey = tuple[str, str | None, str | None, Logo | None]
+
+
+class Document(NamedTuple):
+    """A laid out bookmark, rendered page by page by document()"""
+
+    content: Content
+    tables: list[TableGenerator]
+    config: PageConfig
+
+
+def content_key(content: Content) -> ContentKey:
+    return content.title, content.subtitle, content.url, content.logo
+
+
+def _rows_bytes(merged: list[Row]) -> int:
+    return sum(len(row.date or "") + len(row.info or "") for row in merged)
+
+
+def _layout_bytes(laid_out: tuple[PageConfig, list[TableGenerator]]) -> int:
+    return sum(len(line) for table in laid_out[1] for line in table.data)
+
+
+@sized_cache(STAGE_BYTES, lambda days: DAY_BYTES * len(days._date_info))
+def calendar(key: CalendarKey) -> HebrewCalendar:
+    start_date, end_date, major_holidays, minor_holidays, extra_holidays = key
+    with metrics.stage("calendar"):
+        return HebrewCalendar(
+            *convert_date(start_date, end_date),
+            major_holidays=major_holidays,
+            minor_holidays=minor_holidays,
+            extra_holidays=extra_holidays,
+        )
+
+
+@sized_cache(STAGE_BYTES, _rows_bytes)
+def rows(key: RowsKey) -> list[Row]:
+    calendar_key, chapters, shabbos, bold = key
+    days = calendar(calendar_key)
+    with metrics.stage("rows", rows=size_class(len(chapters.items))):
+        return days.generate_csv(iter(chapters.items), shabbos=shabbos, bold=bold)
+
+
+@sized_cache(STAGE_BYTES, _layout_bytes)
+def layout(key: LayoutKey) -> tuple[PageConfig, list[TableGenerator]]:
+    rows_key, width, height, font = key
+    merged = rows(rows_key)
+    config = PageConfig(Size(width, height), font)
+    with metrics.stage("layout", rows=size_class(len(merged))) as stage:
+        tables = get_svg_tables(merged, config, get_idx(config, len(merged)))
+        stage.label(pages=size_class(len(tables)))
+    return config, tables
+
+
+class PageNotFound(Exception):
+    pass
+
+
+@sized_cache(STAGE_BYTES, lambda page: len(page[0]))
+def preview(key: LayoutKey, content: ContentKey, page: int) -> tuple[str, int]:
+    """Page `page` (from 1) as a standalone svg, and the number of pages"""
+    rows_key, width, height, font = key
+    merged = rows(rows_key)
+    config = PageConfig(Size(width, height), font)
+    idx = get_idx(config, len(merged))
+    # an empty bookmark still has its one empty page, like get_svg_tables
+    total = math.ceil(len(merged) / page_rows(config, idx)) if merged else 1
+    if not 1 <= page <= total:
+        raise PageNotFound(f"Page {page} of {total} does not exist")
+    data = Content(*content)
+    with metrics.stage("svg_render", pages="1"):
+        table = get_svg_table(merged, config, idx, page - 1)
+        svg = page_template(data, config, idx).fill(table)
+    return svg, total
+
+
+STAGES = {"calendar": calendar, "rows": rows, "layout": layout, "preview": preview}
+
+
+# Printers of the staged bookmarks get the keys of the layout and of the content
+
+
+def keep(key: LayoutKey, content: ContentKey) -> Document:
+    """Printer handing the layout back, to be streamed by the caller with document()"""
+    config, tables = layout(key)
+    return Document(Content(*content), tables, config)
+
+
+def html_document(key: LayoutKey, content: ContentKey) -> str:
+    return "".join(document(keep(key, content)))
+
+
+def preview_page(page: int, key: LayoutKey, content: ContentKey) -> tuple[str, int]:
+    """Printer of a single page, bound to it with functools.partial"""
+    return preview(key, content, page)
+
+
+def document(laid_out: Document) -> Iterator[str]:
+    """The printable html document, rendering a page only when it is pulled"""
+    return stream_html(laid_out.content, laid_out.tables, laid_out.config)
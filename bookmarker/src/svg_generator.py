@@ -1,9 +1,11 @@
 from dataclasses import dataclass, field
+from functools import lru_cache
 from io import BytesIO
 from typing import Optional
 import qrcode
 import qrcode.image.svg as svg
 from src.config import Logo, Row, PageConfig
+from src.utils import BOLD, UNDERLINE, RowLayout, layout_rows, page_rows
 
 @dataclass
 class SvgConfig:
@@ -26,21 +28,17 @@ class TableGenerator:
         self.data = list()
 
     def add_row(self, cell: Row, row_idx: int, column_idx: int) -> None:
-        date_w = self.idx[column_idx].date
-        info_w = self.idx[column_idx].info
-
-        s1 = f'<text x="{date_w}" y="{row_idx * 10}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{cell.date}</text>'
-        if cell.bold:
-            s2 = f'<text x="{info_w}" y="{row_idx * 10}" text-anchor="end" font-family="Arial" font-size="10" font-weight="bold" fill="#1A1A1A">{cell.info}</text>'
-        else:
-            s2 = f'<text x="{info_w}" y="{row_idx * 10}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{cell.info}</text>'
-
-        self.data.append(s1)
-        self.data.append(s2)
-        if cell.underline:
-            sep = f'<line x1="{date_w-100}" y1="{row_idx * 10 + 2}" x2="{date_w}" y2="{row_idx * 10 + 2}" stroke="#88A0B8" stroke-width="0.5"/>'
-            self.data.append(sep)
-
+        self.data.append(col_to_svg(cell, row_idx, column_idx, self.idx))
+
+    def add_rows(self, cells: list[Row], layout: RowLayout, rows: range) -> None:
+        """Serialize a page worth of laid out rows"""
+        page = slice(rows.start, rows.stop)
+        self.data.extend(
+            _row_svg(date_w, info_w, y, cell.date, cell.info, flags & BOLD, flags & UNDERLINE)
+            for date_w, info_w, y, flags, cell in zip(
+                layout.x_date[page], layout.x_info[page], layout.y[page], layout.flags[page], cells[page]
+            )
+        )
 
     def build(self) -> str:
         line_margin = 5
@@ -58,13 +56,17 @@ class TableGenerator:
         """
 
 class PageGenerator:
-    def __init__(self, conf: SvgConfig, title: str, subtitle: Optional[str], url: Optional[str], logo: Optional[Logo], table: TableGenerator) -> None:
+    qr_margin = 5
+
+    def __init__(self, conf: SvgConfig, title: str, subtitle: Optional[str], url: Optional[str], logo: Optional[Logo], table: TableGenerator, shared_defs: bool = False) -> None:
         self.conf = conf
         self.title = title
         self.subtitle = subtitle
         self.url = url
         self.logo = logo
         self.table = table
+        # refer to the QR code and logo of get_defs() instead of embedding them
+        self.shared_defs = shared_defs
 
     def get_page(self, frame_margin: int = 10) -> str:
         return f"""
@@ -95,22 +97,26 @@ class PageGenerator:
     
     def get_footer(self, url: Optional[str], logo: Optional[Logo]) -> str:
         y_offset = self.conf.page_config.size.height - 2 * self.conf.footer_margin - self.conf.qr_size - 2
-        qr_margin = 5
+        qr_margin = self.qr_margin
         space = 2
 
         qr_svg = url_svg = ""
         if url:
             pos = self.conf.qr_size + space + qr_margin if logo else self.conf.qr_size // 2
+            qr = '<use xlink:href="#bookmark-qr"/>' if self.shared_defs else _qr_svg_snippet(url)
             qr_svg = f"""
             <g transform="translate({0 - pos},0)">
-                    {_qr_svg_snippet(url)}
+                    {qr}
             </g>
             """
             url_svg = f'<text x="0" y="{self.conf.qr_size + space}" text-anchor="middle" font-family="Arial" font-size="8">{url}</text>'
         logo_svg = ""
         if logo:
             pos = -qr_margin if url else 0
-            logo_svg = f'<image href="data:{logo.content_type};base64,{logo.base64_data}" x="{pos}" y="{qr_margin}" height="{self.conf.qr_size - 2 * qr_margin}" />'
+            if self.shared_defs:
+                logo_svg = f'<use xlink:href="#bookmark-logo" x="{pos}" y="{qr_margin}"/>'
+            else:
+                logo_svg = f'<image xlink:href="data:{logo.content_type};base64,{logo.base64_data}" x="{pos}" y="{qr_margin}" height="{self.conf.qr_size - 2 * qr_margin}" />'
 
         return f"""
         <!-- Fotter -->
@@ -125,7 +131,7 @@ class PageGenerator:
         frame_margin = 10
 
         return f"""
-        <svg xmlns="http://www.w3.org/2000/svg" width="{self.conf.page_config.size_cm.width}cm" height="{self.conf.page_config.size_cm.height}cm" viewBox="0 0 {self.conf.page_config.size.width} {self.conf.page_config.size.height}">
+        <svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{self.conf.page_config.size_cm.width}cm" height="{self.conf.page_config.size_cm.height}cm" viewBox="0 0 {self.conf.page_config.size.width} {self.conf.page_config.size.height}">
         {self.get_page(frame_margin)}
         <g transform="translate(0,{frame_margin})">
             {self.get_title(self.title, self.subtitle)}
@@ -135,42 +141,84 @@ class PageGenerator:
         </svg>
         """
 
-def col_to_svg(col: Row, row: int, page: int, idx: list[Row]) -> str:
-    date_w = idx[page].date
-    info_w = idx[page].info
+    def get_defs(self) -> str:
+        """Hidden svg with the QR code and logo, for pages built with shared_defs."""
+        defs = []
+        if self.url:
+            defs.append(f'<g id="bookmark-qr">{_qr_svg_snippet(self.url)}</g>')
+        if self.logo:
+            defs.append(f'<image id="bookmark-logo" xlink:href="data:{self.logo.content_type};base64,{self.logo.base64_data}" height="{self.conf.qr_size - 2 * self.qr_margin}" />')
+        if not defs:
+            return ""
+        return f"""
+        <svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" style="position:absolute;width:0;height:0;border:0">
+        <defs>
+            {"".join(defs)}
+        </defs>
+        </svg>
+        """
 
-    s1 = f'<text x="{date_w}" y="{row * 10}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{col.date}</text>'
-    if col.bold:
-        s2 = f'<text x="{info_w}" y="{row * 10}" text-anchor="end" font-family="Arial" font-size="10" font-weight="bold" fill="#1A1A1A">{col.info}</text>'
-    else:
-        s2 = f'<text x="{info_w}" y="{row * 10}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{col.info}</text>'
 
-    if not col.underline:
-        return f"{s1}\n{s2}"
-    return f'{s1}\n{s2}\n<line x1="{date_w-100}" y1="{row * 10 + 2}" x2="{date_w}" y2="{row * 10 + 2}" stroke="#88A0B8" stroke-width="0.5"/>'
+_ROWS_SLOT = "\0rows\0"
 
 
-def get_svg_tables(column: list[Row], conf: PageConfig, idx: list[Row]) -> list[TableGenerator]:
-    out_files = [TableGenerator(conf, idx)]
-    column_counter = 0
-    visited_rows = 0
+class PageTemplate:
+    """
+    PageGenerator output compiled once for a job. Pages of the same job only
+    differ by their table rows, which fill() puts in place.
+    """
+
+    def __init__(self, conf: SvgConfig, title: str, subtitle: Optional[str], url: Optional[str], logo: Optional[Logo], idx: list[Row], shared_defs: bool = False) -> None:
+        table = TableGenerator(conf.page_config, idx)
+        table.data.append(_ROWS_SLOT)
+        page = PageGenerator(conf, title, subtitle, url, logo, table, shared_defs)
+        self.head, self.tail = page.build().split(_ROWS_SLOT)
+        self.defs = page.get_defs() if shared_defs else ""
 
-    for i, cell in enumerate(column):
-        row = i - visited_rows
-        if row >= conf.max_lines:
-            visited_rows = i
-            row = 0
-            column_counter += 1
+    def fill(self, table: TableGenerator) -> str:
+        return "".join((self.head, "\n".join(table.data), self.tail))
 
-            if column_counter >= len(idx):
-                column_counter = 0
-                out_files.append(TableGenerator(conf, idx))
+def _row_svg(date_w: float, info_w: float, y: int, date: str, info: str, bold: bool, underline: bool) -> str:
+    weight = ' font-weight="bold"' if bold else ""
+    if not underline:
+        return (
+            f'<text x="{date_w}" y="{y}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{date}</text>\n'
+            f'<text x="{info_w}" y="{y}" text-anchor="end" font-family="Arial" font-size="10"{weight} fill="#1A1A1A">{info}</text>'
+        )
+    return (
+        f'<text x="{date_w}" y="{y}" text-anchor="end" font-family="Arial" font-size="10" fill="#1A1A1A">{date}</text>\n'
+        f'<text x="{info_w}" y="{y}" text-anchor="end" font-family="Arial" font-size="10"{weight} fill="#1A1A1A">{info}</text>\n'
+        f'<line x1="{date_w-100}" y1="{y + 2}" x2="{date_w}" y2="{y + 2}" stroke="#88A0B8" stroke-width="0.5"/>'
+    )
 
-        out_files[-1].add_row(cell, row, column_counter)
 
+def col_to_svg(col: Row, row: int, page: int, idx: list[Row]) -> str:
+    return _row_svg(idx[page].date, idx[page].info, row * 10, col.date, col.info, col.bold, col.underline)
+
+
+def get_svg_tables(column: list[Row], conf: PageConfig, idx: list[Row]) -> list[TableGenerator]:
+    if not column:
+        return [TableGenerator(conf, idx)]
+
+    layout = layout_rows(column, conf, idx)
+    out_files = []
+    for rows in layout.pages():
+        table = TableGenerator(conf, idx)
+        table.add_rows(column, layout, rows)
+        out_files.append(table)
     return out_files
 
 
+def get_svg_table(column: list[Row], conf: PageConfig, idx: list[Row], page: int) -> TableGenerator:
+    """Page `page` (from 0) of get_svg_tables, laying out only its rows"""
+    per_page = page_rows(conf, idx)
+    cells = column[page * per_page : (page + 1) * per_page]
+    table = TableGenerator(conf, idx)
+    if cells:
+        table.add_rows(cells, layout_rows(cells, conf, idx), range(len(cells)))
+    return table
+
+
 def _gen_header(idx: list[Row]) -> str:
     s = []
     for date, info, _, _ in idx:
@@ -182,8 +230,12 @@ def _gen_header(idx: list[Row]) -> str:
         )
     return "\n".join(s)
 
+@lru_cache(maxsize=64)
 def _qr_svg_snippet(url: str) -> str:
-    """Generate QR code SVG snippet (only the <svg> content) as string."""
+    """
+    Generate QR code SVG snippet (only the <svg> content) as string.
+    Cached, as every page of a bookmark carries the same url.
+    """
     img = qrcode.make(url, image_factory=svg.SvgPathImage)
     buf = BytesIO()
     img.save(buf)
@@ -1,6 +1,8 @@
 import datetime
+from array import array
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable
+from typing import Callable, Iterable, Sequence
 
 from pyluach.dates import HebrewDate
 from src.config import PageConfig, Row
@@ -22,6 +24,65 @@ def get_idx(conf: PageConfig, csv_lines: int) -> list[Row]:
     return idx
 
 
+BOLD = 1
+UNDERLINE = 2
+
+
+@dataclass
+class RowLayout:
+    """
+    Position of every row of a bookmark, computed once for all pages.
+    Entry i of each array belongs to row i of the input.
+    """
+
+    x_date: array
+    x_info: array
+    y: array
+    flags: array
+    rows_per_page: int
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+    def pages(self) -> list[range]:
+        """Input rows of every page"""
+        n = len(self)
+        return [
+            range(start, min(start + self.rows_per_page, n))
+            for start in range(0, n, self.rows_per_page)
+        ]
+
+
+def page_rows(conf: PageConfig, idx: list[Row]) -> int:
+    """Rows on a full page, `conf.max_lines` in each column of `idx`"""
+    return max(int(conf.max_lines), 1) * len(idx)
+
+
+def layout_rows(cells: Sequence[Row], conf: PageConfig, idx: list[Row]) -> RowLayout:
+    max_lines = max(int(conf.max_lines), 1)
+    rows_per_page = page_rows(conf, idx)
+    n = len(cells)
+    pages = -(-n // rows_per_page)
+
+    # every page shares the same positions, lay out one and tile it
+    def tile(typecode: str, per_column: Callable[[int], Iterable]) -> array:
+        one_page = array(typecode)
+        for c in range(len(idx)):
+            one_page.extend(per_column(c))
+        return (one_page * pages)[:n]
+
+    return RowLayout(
+        x_date=tile("d", lambda c: [idx[c].date] * max_lines),
+        x_info=tile("d", lambda c: [idx[c].info] * max_lines),
+        y=tile("I", lambda c: range(0, max_lines * 10, 10)),
+        flags=array(
+            "B",
+            ((BOLD if cell.bold else 0) | (UNDERLINE if cell.underline else 0) for cell in cells),
+        ),
+        rows_per_page=rows_per_page,
+    )
+
+
 def read_csv(filename: str) -> list[Row]:
     with Path(filename).open("r", encoding="utf8") as file:
         return parse_csv(file)
@@ -72,6 +133,10 @@ def get_heb_year(year: str) -> int:
     return thousands + sum(map(heb_to_int, year[1:]))
 
 
-def get_simhat_tora_by(year: str) -> tuple[HebrewDate, HebrewDate]:
-    s = HebrewDate(get_heb_year(year), 7, 23)
+def simhat_tora_year(year: int) -> tuple[HebrewDate, HebrewDate]:
+    s = HebrewDate(year, 7, 23)
     return s, s.add(years=1).subtract(days=1)
+
+
+def get_simhat_tora_by(year: str) -> tuple[HebrewDate, HebrewDate]:
+    return simhat_tora_year(get_heb_year(year))
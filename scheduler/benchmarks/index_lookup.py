@@ -0,0 +1,79 @@
+"""
+Corpus lookup latency: re-reading index.json per lookup versus the
+preloaded SefariaIndex. Uses SEFARIA_INDEX when it exists, otherwise a
+synthetic index of the same shape.
+
+    cd scheduler && python -m benchmarks.index_lookup
+"""
+import json
+import tempfile
+import timeit
+from pathlib import Path
+
+from src.index import INDEX_PATH, SefariaIndex
+
+NUMBER = 200
+BOOKS = ["Mishnah", "Talmud Bavli", "Talmud Yerushalmi", "bavli", "Mishna", "Tanakh"]
+
+
+def synthetic_index() -> list[dict]:
+    def seders(corpus: str, tractates: int) -> list[dict]:
+        return [
+            {
+                "category": f"Seder {s}",
+                "contents": [
+                    {"title": f"{corpus} {s}.{t}", "corpus": corpus}
+                    for t in range(s, tractates, 6)
+                ]
+                + [{"category": f"Commentary {s}", "contents": []}],
+            }
+            for s in range(6)
+        ]
+
+    filler = [{"category": f"Category {i}", "contents": seders(f"Corpus {i}", 40)} for i in range(20)]
+    return filler + [
+        {"category": "Mishnah", "heCategory": "משנה", "contents": seders("Mishnah", 63)},
+        {
+            "category": "Talmud",
+            "heCategory": "תלמוד",
+            "contents": [
+                {"category": "Bavli", "heCategory": "בבלי", "contents": seders("Bavli", 38)},
+                {"category": "Yerushalmi", "heCategory": "ירושלמי", "contents": seders("Yerushalmi", 38)},
+            ],
+        },
+    ]
+
+
+def reread_and_scan(path: Path, book: str) -> list[str]:
+    """The lookup before SefariaIndex: load the json, then scan it"""
+    with path.open("r", encoding="utf-8-sig") as fd:
+        idx = json.load(fd)
+    alt, alt2 = book.split(" ")[0], book.split(" ")[-1]
+    for d in idx:
+        if d["category"] in {book, alt}:
+            category = d["contents"]
+            if alt2 != alt:
+                category = next((d2["contents"] for d2 in d["contents"] if d2["category"] in {book, alt, alt2}), category)
+            return [d2["title"] for d1 in category for d2 in d1.get("contents", ()) if d2.get("corpus") in {book, alt2}]
+    return []
+
+
+def main() -> None:
+    path = Path(INDEX_PATH)
+    if not path.exists():
+        path = Path(tempfile.mkdtemp()) / "index.json"
+        path.write_text(json.dumps(synthetic_index()), encoding="utf-8")
+        print(f"{INDEX_PATH} not found, using a synthetic index")
+
+    index = SefariaIndex(path)
+    load = timeit.timeit(lambda: SefariaIndex(path).titles(""), number=10) / 10
+    print(f"{'load index':<28} {load * 1e3:10.2f} ms")
+    for book in BOOKS:
+        found = index.find(book)
+        reread = timeit.timeit(lambda: reread_and_scan(path, book), number=NUMBER // 10) / (NUMBER // 10)
+        preloaded = timeit.timeit(lambda: index.find(book), number=NUMBER) / NUMBER
+        print(f"{book!r:<20} {len(found):>4}  re-read {reread * 1e6:10.1f} us  preloaded {preloaded * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
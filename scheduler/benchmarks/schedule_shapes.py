@@ -0,0 +1,64 @@
+"""
+Scheduling time for whole corpora, on synthetic shapes the size of the
+Mishnah (63 tractates, ~4200 mishnayot), the Bavli (37 tractates, ~2700
+dafim) and the Yerushalmi (39 tractates, chapters of halakhot).
+
+    cd scheduler && python -m benchmarks.schedule_shapes
+"""
+import random
+import timeit
+
+from src.main import schedule_by_days, schedule_by_page, schedule_by_section, schedule_continuous
+from src.model import BookShape, SectionInterval
+
+NUMBER = 20
+
+
+def corpora() -> dict[str, list[BookShape]]:
+    rng = random.Random(0)
+    mishnah = [
+        BookShape(bookname=f"Mishnah {i}", shape=[rng.randint(4, 12) for _ in range(rng.randint(3, 13))])
+        for i in range(63)
+    ]
+    bavli = [
+        BookShape(
+            bookname=f"Bavli {i}",
+            shape=[0, 0] + [rng.randint(6, 25) for _ in range(2 * rng.randint(20, 150) - 1)],
+            paged=True,
+        )
+        for i in range(37)
+    ]
+    yerushalmi = [
+        BookShape(bookname=f"Yerushalmi {i}", shape=[rng.randint(3, 9) for _ in range(rng.randint(3, 11))])
+        for i in range(39)
+    ]
+    return {"Mishnah": mishnah, "Bavli": bavli, "Yerushalmi": yerushalmi}
+
+
+def main() -> None:
+    rng = random.Random(1)
+    for name, books in corpora().items():
+        sections = sum(book.total_sections for book in books)
+        weights = {book.bookname: [rng.randint(5, 200) for _ in range(book.total_sections)] for book in books}
+        print(f"{name}: {len(books)} books, {sections} sections")
+        runs = {
+            "2 sections a day": lambda: schedule_by_section(books, SectionInterval(section=2, chapter=0)),
+            "2 sections a day, continuous": lambda: schedule_continuous(
+                name, books, SectionInterval(section=2, chapter=0)
+            ),
+            "in 365 days": lambda: schedule_by_days(name, books, 365),
+            "in 365 days, continuous": lambda: schedule_by_days(name, books, 365, continuous=True),
+            "in 365 days, weighted": lambda: schedule_by_days(name, books, 365, weights=weights),
+            "in 365 days, weighted, continuous": lambda: schedule_by_days(
+                name, books, 365, continuous=True, weights=weights
+            ),
+        }
+        if all(book.paged for book in books):
+            runs["daf a day"] = lambda: schedule_by_page(name, books, 1)
+            runs["daf a day, continuous"] = lambda: schedule_by_page(name, books, 1, continuous=True)
+        for run, fn in runs.items():
+            print(f"  {run:<36} {timeit.timeit(fn, number=NUMBER) / NUMBER * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
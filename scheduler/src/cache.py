@@ -0,0 +1,176 @@
+import asyncio
+import pickle
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from aiocache.base import BaseCache
+from aiocache.serializers import NullSerializer
+
+
+class TieredCache(BaseCache):
+    """
+    aiocache backend with a size-bounded LRU memory tier, and an optional
+    zlib-compressed SQLite tier (one file per namespace under `directory`)
+    that survives restarts and is shared by the workers of a machine.
+    Entries past their ttl are dropped on read, so the next call fetches
+    them again.
+    """
+
+    NAME = "tiered"
+
+    def __init__(self, serializer=None, max_entries: int = 64, directory: str | None = None, **kwargs):
+        super().__init__(serializer=serializer or NullSerializer(), **kwargs)
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, tuple[object, float | None]] = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+        self._db = None
+        if directory:
+            Path(directory).mkdir(parents=True, exist_ok=True)
+            self._db = Path(directory) / f"{self.namespace or 'default'}.sqlite"
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+                )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # the connection's own context manager only commits, closing() releases the file
+        with closing(sqlite3.connect(self._db, timeout=10)) as db, db:
+            yield db
+
+    def _disk_get(self, key: str):
+        with self._connect() as db:
+            return db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+
+    def _disk_set(self, key: str, value: object, expires_at: float | None) -> None:
+        blob = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, blob, expires_at))
+
+    def _disk_delete(self, key: str | None = None, namespace: str | None = None) -> int:
+        with self._connect() as db:
+            if key is not None:
+                return db.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+            if namespace:
+                return db.execute("DELETE FROM cache WHERE key LIKE ?", (f"{namespace}%",)).rowcount
+            return db.execute("DELETE FROM cache").rowcount
+
+    def _remember(self, key: str, value: object, expires_at: float | None) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _expires_at(ttl) -> float | None:
+        return time.time() + ttl if ttl else None
+
+    @staticmethod
+    def _expired(expires_at: float | None) -> bool:
+        return expires_at is not None and expires_at <= time.time()
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        expired = False
+        if key in self._memory:
+            value, expires_at = self._memory[key]
+            if not self._expired(expires_at):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+            expired = True
+
+        if self._db:
+            row = await asyncio.to_thread(self._disk_get, key)
+            if row and not self._expired(row[1]):
+                value = pickle.loads(zlib.decompress(row[0]))
+                self._remember(key, value, row[1])
+                self.stats["disk_hits"] += 1
+                return value
+            if row:
+                expired = True
+                await asyncio.to_thread(self._disk_delete, key)
+
+        self.stats["misses"] += 1
+        self.stats["expired"] += expired
+        return None
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._get(key, encoding=encoding) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        if _cas_token is not None and _cas_token != self._memory.get(key, (None,))[0]:
+            return 0
+        expires_at = self._expires_at(ttl)
+        self._remember(key, value, expires_at)
+        if self._db:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+        return True
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        for key, value in pairs:
+            await self._set(key, value, ttl=ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        if await self._exists(key):
+            raise ValueError("Key {} already exists, use .set to update the value".format(key))
+        return await self._set(key, value, ttl=ttl)
+
+    async def _exists(self, key, _conn=None):
+        return await self._get(key) is not None
+
+    async def _increment(self, key, delta, _conn=None):
+        value = await self._get(key)
+        try:
+            value = int(value or 0) + delta
+        except ValueError:
+            raise TypeError("Value is not an integer") from None
+        await self._set(key, value)
+        return value
+
+    async def _expire(self, key, ttl, _conn=None):
+        value = await self._get(key)
+        if value is None:
+            return False
+        await self._set(key, value, ttl=ttl)
+        return True
+
+    async def _delete(self, key, _conn=None):
+        deleted = int(self._memory.pop(key, None) is not None)
+        if self._db:
+            deleted = max(deleted, await asyncio.to_thread(self._disk_delete, key))
+        return deleted
+
+    async def _clear(self, namespace=None, _conn=None):
+        if namespace:
+            for key in [k for k in self._memory if k.startswith(namespace)]:
+                del self._memory[key]
+        else:
+            self._memory.clear()
+        if self._db:
+            await asyncio.to_thread(self._disk_delete, None, namespace)
+        return True
+
+    async def _raw(self, command, *args, encoding="utf-8", _conn=None, **kwargs):
+        return getattr(self._memory, command)(*args, **kwargs)
+
+    async def _redlock_release(self, key, value):
+        if self._memory.get(key, (None,))[0] == value:
+            return await self._delete(key)
+        return 0
+
+    @classmethod
+    def parse_uri_path(cls, path):
+        return {}
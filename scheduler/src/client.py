@@ -0,0 +1,91 @@
+import asyncio
+import importlib.util
+import os
+import urllib.parse
+
+import httpx
+
+from src.metrics import metrics
+
+SEFARIA_URL = os.environ.get("SEFARIA_URL", "https://www.sefaria.org")
+
+# httpx negotiates HTTP/2 only with the optional h2 package (httpx[http2])
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class SefariaClient:
+    """
+    Long-lived client for the Sefaria API. Connections are kept alive and
+    reused, at most `concurrency` requests are in flight, and failed
+    requests (connection errors, 5xx, 429) are retried with exponential
+    backoff.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.transport = transport  # httpx.MockTransport in tests
+        self._client: httpx.AsyncClient | None = None
+        self._slots = asyncio.Semaphore(concurrency)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2,
+                timeout=httpx.Timeout(self.timeout, connect=10),
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency,
+                ),
+            )
+        return self._client
+
+    async def get(self, path: str) -> httpx.Response:
+        async with self._slots:
+            for attempt in range(self.retries + 1):
+                last_attempt = attempt == self.retries
+                with metrics.stage("sefaria_fetch") as stage:
+                    try:
+                        response = await self.client.get(path)
+                    except httpx.RequestError:
+                        stage.label(status="error")
+                        if last_attempt:
+                            raise
+                    else:
+                        stage.label(status=str(response.status_code))
+                        if response.status_code not in RETRY_STATUS or last_attempt:
+                            return response
+                metrics.inc("sefaria_retries_total")
+                await asyncio.sleep(self.backoff * 2**attempt)
+
+    async def get_text(self, book: str) -> httpx.Response:
+        return await self.get(f"/api/v3/texts/{urllib.parse.quote(book)}")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+sefaria = SefariaClient(
+    SEFARIA_URL,
+    concurrency=int(os.environ.get("SEFARIA_CONCURRENCY", 8)),
+    retries=int(os.environ.get("SEFARIA_RETRIES", 3)),
+    timeout=float(os.environ.get("SEFARIA_TIMEOUT", 30)),
+)
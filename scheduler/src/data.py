@@ -1,32 +1,71 @@
 import asyncio
 from aiocache import cached
-import json
-import traceback
-import urllib
-from pathlib import Path
+import os
+import re
+from array import array
+from typing import NamedTuple
 
 import httpx
 from fastapi import HTTPException
 
-from src.model import Book, BookData
+from src.cache import TieredCache
+from src.client import sefaria
+from src.index import sefaria_index
+from src.model import Book, BookShape, Section, Shape, Weights
 
-@cached()
-async def fetch_data_by_text(book: str) -> dict:
-    """Fetch Mishna Zraim data from Sefaria API"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://www.sefaria.org/api/v3/texts/{urllib.parse.quote(book)}"
-            )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=503, detail="Failed to fetch data from Sefaria"
-                )
-            return response.json()
-        except httpx.RequestError:
+CACHE_DIR = os.environ.get("SCHEDULER_CACHE_DIR")
+CACHE_TTL = int(os.environ.get("SCHEDULER_CACHE_TTL", 7 * 24 * 3600))
+CACHE_ENTRIES = int(os.environ.get("SCHEDULER_CACHE_ENTRIES", 64))
+
+TAGS = re.compile(r"<[^>]+>")
+
+
+async def request_text(book: str) -> dict:
+    try:
+        response = await sefaria.get_text(book)
+        if response.status_code != 200:
             raise HTTPException(
-                status_code=503, detail="Failed to connect to Sefaria API"
+                status_code=503, detail="Failed to fetch data from Sefaria"
             )
+        return response.json()
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=503, detail="Failed to connect to Sefaria API"
+        )
+
+
+class BookProfile(NamedTuple):
+    """What the schedules need of a book, without its text"""
+
+    shape: BookShape
+    weights: Weights
+
+
+@cached(
+    cache=TieredCache,
+    namespace="profiles",
+    ttl=CACHE_TTL,
+    max_entries=CACHE_ENTRIES,
+    directory=CACHE_DIR,
+)
+async def fetch_profile(book: str) -> BookProfile:
+    """
+    Shape and words per section of a book, both read from a single download.
+    Only they are cached, the text is dropped right away.
+    """
+    data = await request_text(book)
+    shape = BookShape(bookname=book, shape=parse_shape(data), paged=is_paged(data))
+    return BookProfile(shape, parse_weights(data))
+
+
+async def fetch_shape(book: str) -> BookShape:
+    """Sections per chapter of a book"""
+    return (await fetch_profile(book)).shape
+
+
+async def fetch_weights(book: str) -> Weights:
+    """Words per section of a book"""
+    return (await fetch_profile(book)).weights
 
 
 def parse_text_structure(data: dict) -> Book:
@@ -34,40 +73,30 @@ def parse_text_structure(data: dict) -> Book:
     return data["versions"][0]["text"]
 
 
-def find_category_in_index(book: str, idx_json: dict) -> dict | None:
-    alt = book.split(" ")[0]
-    for d in idx_json:
-        if d["category"] in {book, alt}:
-            if (alt2 := book.split(" ")[-1]) != alt:
-                for d2 in d["contents"]:
-                    if d2["category"] in {book, alt, alt2}:
-                        return d2["contents"]
-            return d["contents"]
-    return None
+def parse_shape(data: dict) -> Shape:
+    return list(map(len, parse_text_structure(data)))
 
 
-def find_corpus_in_category(book: str, category: dict) -> list[str]:
-    if not book:
-        return list()
-    alt = book.split(" ")[-1]
-    try:
-        return [
-            d2["title"]
-            for d1 in category
-            for d2 in d1["contents"]
-            if d2.get("corpus", "XXX") in {book, alt}
-        ]
-    except KeyError as ke:
-        print(traceback.print_exception(ke))
-        return list()
+def count_words(section: Section | list) -> int:
+    if isinstance(section, str):
+        return len(TAGS.sub(" ", section).split())
+    return sum(map(count_words, section))
 
 
-def find_corpus(book: str):
-    with Path("../resource/index.json").open("r", encoding="utf-8-sig") as fd:
-        idx = json.load(fd)
-    cat = find_category_in_index(book, idx)
-    if cat:
-        return find_corpus_in_category(book, cat)
+def parse_weights(data: dict) -> Weights:
+    return array(
+        "I",
+        (count_words(section) for chapter in parse_text_structure(data) for section in chapter),
+    )
+
+
+def is_paged(data: dict) -> bool:
+    """Whether the chapters of the text are the amudim of a daf"""
+    return data.get("addressTypes", [None])[0] == "Talmud"
+
+
+def find_corpus(book: str) -> list[str]:
+    return sefaria_index.find(book)
 
 
 def test_corpus():
@@ -75,12 +104,17 @@ def test_corpus():
     assert len(find_corpus("Talmud Bavli")) == 38
     assert len(find_corpus("Talmud Yerushalmi")) == 38
 
-@cached()
-async def fetch(book: str):
+@cached(
+    cache=TieredCache,
+    namespace="book_shapes",
+    ttl=CACHE_TTL,
+    max_entries=CACHE_ENTRIES,
+    directory=CACHE_DIR,
+)
+async def fetch(book: str) -> list[BookShape]:
     # try single book (text)
     try:
-        mishna_data = await fetch_data_by_text(book)
-        return [BookData(bookname=book, book=parse_text_structure(mishna_data))]
+        return [await fetch_shape(book)]
     except HTTPException:
         pass
     # try corpus (text)
@@ -88,9 +122,4 @@ async def fetch(book: str):
     if not books:
         raise HTTPException(status_code=400, detail="Book not found")
 
-    async def process_book(book):
-        mishna_data = await fetch_data_by_text(book)
-        return BookData(bookname=book, book=parse_text_structure(mishna_data))
-
-    tasks = [process_book(book) for book in books]
-    return await asyncio.gather(*tasks)
+    return await asyncio.gather(*map(fetch_shape, books))
@@ -0,0 +1,133 @@
+import difflib
+import json
+import os
+import threading
+from pathlib import Path
+
+from src.metrics import metrics, size_class
+
+INDEX_PATH = os.environ.get("SEFARIA_INDEX", "../resource/index.json")
+
+Scope = dict[str, list[str]]  # corpus -> titles
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def _scope(contents: list[dict]) -> Scope:
+    """Titles of the texts one sub category below `contents`, by corpus"""
+    scope: Scope = {}
+    for d1 in contents:
+        for d2 in d1.get("contents", ()):
+            if "title" in d2 and "corpus" in d2:
+                scope.setdefault(d2["corpus"], []).append(d2["title"])
+    return scope
+
+
+class SefariaIndex:
+    """
+    Sefaria's table of contents (index.json), loaded once into dictionaries
+    and reloaded when the file changes on disk.
+    A corpus is looked up by its category, optionally followed by a sub
+    category ("Mishnah", "Talmud Bavli"); corpus names, Hebrew category
+    names, different casing and close misspellings resolve to it as well.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._mtime: int | None = None
+        self._lock = threading.Lock()
+        self._categories: dict[str, Scope] = {}
+        self._sub_categories: dict[tuple[str, str], Scope] = {}
+        self._aliases: dict[str, str] = {}
+
+    def _refresh(self) -> None:
+        mtime = self.path.stat().st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with self.path.open("r", encoding="utf-8-sig") as fd:
+                self._build(json.load(fd))
+            self._mtime = mtime
+
+    def _build(self, idx: list[dict]) -> None:
+        categories: dict[str, Scope] = {}
+        sub_categories: dict[tuple[str, str], Scope] = {}
+        aliases: dict[str, str] = {}
+
+        def alias(name: str | None, book: str) -> None:
+            if name:
+                aliases.setdefault(_normalize(name), book)
+
+        for d in idx:
+            if "category" not in d or d["category"] in categories:
+                continue
+            category = d["category"]
+            categories[category] = _scope(d["contents"])
+            if category in categories[category]:
+                alias(category, category)
+                alias(d.get("heCategory"), category)
+
+            for d2 in d["contents"]:
+                if "category" not in d2 or (category, d2["category"]) in sub_categories:
+                    continue
+                sub = d2["category"]
+                scope = sub_categories[category, sub] = _scope(d2["contents"])
+                book = f"{category} {sub}"
+                if not scope.keys() & {book, sub}:
+                    continue
+                alias(book, book)
+                alias(sub, book)
+                if d.get("heCategory") and d2.get("heCategory"):
+                    alias(f"{d['heCategory']} {d2['heCategory']}", book)
+                alias(d2.get("heCategory"), book)
+                for corpus in scope:
+                    alias(corpus, book)
+
+        self._categories = categories
+        self._sub_categories = sub_categories
+        self._aliases = aliases
+
+    def titles(self, book: str) -> list[str]:
+        """Titles of a corpus, by its exact name"""
+        self._refresh()
+        words = book.split(" ")
+        first, last = words[0], words[-1]
+
+        category = book if book in self._categories else first
+        if category not in self._categories:
+            return []
+        scope = self._categories[category]
+        if last != first:
+            for sub in (book, first, last):
+                if (category, sub) in self._sub_categories:
+                    scope = self._sub_categories[category, sub]
+                    break
+
+        titles = list(scope.get(book, ()))
+        if last != book:
+            titles += scope.get(last, ())
+        return titles
+
+    def resolve(self, book: str) -> str | None:
+        """The corpus name matching `book` by alias or by a close spelling"""
+        self._refresh()
+        name = _normalize(book)
+        if name in self._aliases:
+            return self._aliases[name]
+        match = difflib.get_close_matches(name, self._aliases, n=1, cutoff=0.8)
+        return self._aliases[match[0]] if match else None
+
+    def find(self, book: str) -> list[str]:
+        with metrics.stage("index_lookup") as stage:
+            titles = self.titles(book)
+            if not titles and (resolved := self.resolve(book)) is not None:
+                titles = self.titles(resolved)
+            stage.label(books=size_class(len(titles)))
+        return titles
+
+
+sefaria_index = SefariaIndex(INDEX_PATH)
@@ -1,43 +1,101 @@
+import asyncio
 import math
-import operator
-from itertools import accumulate
+import time
+from contextlib import asynccontextmanager
+from itertools import accumulate, chain
+from typing import Iterable, Iterator, Literal
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
 
-from src.data import fetch
+try:
+    import msgpack
+except ImportError:  # optional, for format=msgpack
+    msgpack = None
+
+from src.client import sefaria
+from src.data import fetch, fetch_profile, fetch_weights
+from src.metrics import metrics, size_class
 from src.model import (
-    Book,
-    BookData,
+    BookShape,
+    CompactScheduleResponse,
     ScheduleRequest,
     ScheduleResponse,
     SectionInterval,
-    SectionsBookmark,
+    Weights,
 )
+from src.schedule import balanced, daf, every, linear_partition, locate, locate_section
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await sefaria.aclose()
+
 
-app = FastAPI(title="Learning Scheduler")
+app = FastAPI(title="Learning Scheduler", lifespan=lifespan)
 
+if metrics.enabled:
 
-def get_book_bookmarks(book: Book, section_interval: int):
-    accumulated_sections = [0] + list(accumulate(map(len, book), operator.add))
-    last_chapter = 0
-    last_section = section_interval
-    while last_section <= accumulated_sections[-1]:
-        while last_section > accumulated_sections[last_chapter]:
-            last_chapter += 1
-        yield SectionsBookmark(
-            chapter=last_chapter,
-            section=last_section - accumulated_sections[last_chapter - 1],
+    @app.middleware("http")
+    async def request_metrics(request: Request, call_next):
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        metrics.observe(
+            "request_seconds",
+            time.perf_counter() - start,
+            path=route.path if route else "unmatched",
+            status=str(response.status_code),
         )
-        last_section += section_interval
-    yield SectionsBookmark(
-        chapter=len(book),
-        section=accumulated_sections[-1] - accumulated_sections[last_chapter - 1],
-    )
+        return response
+
+compact_schedules = TypeAdapter(list[CompactScheduleResponse])
+
+
+def iter_positions(
+    books: list[BookShape], units: Iterable[int], by_chapter: bool = False
+) -> Iterator[tuple[int, int, int]]:
+    """
+    Book index, chapter and section of days ending at `units`, counted
+    across books learned one after the other
+    """
+    sizes = [len(book.shape) if by_chapter else book.total_sections for book in books]
+    prefixes = [book.prefix for book in books]
+    for idx, unit in locate(sizes, units):
+        if by_chapter:
+            yield idx, unit, 1
+        else:
+            yield idx, *locate_section(prefixes[idx], unit)
+
+
+def iter_pages(books: list[BookShape], units: Iterable[int]) -> Iterator[tuple[int, int, str]]:
+    """Like iter_positions, with amudim as units, yields the book index, page and amud"""
+    pages = [book.pages for book in books]
+    for idx, unit in locate(list(map(len, pages)), units):
+        yield idx, *daf(pages[idx][unit - 1])
+
+
+def columns(positions: Iterator[tuple], names: tuple[str, str], books: list[BookShape], named: bool) -> dict:
+    """Columns of the bookmarks at `positions`, see CompactScheduleResponse"""
+    transposed = list(zip(*positions))
+    book_index, first, second = map(list, transposed) if transposed else ([], [], [])
+    result = {names[0]: first, names[1]: second}
+    if named:
+        result.update(books=[book.bookname for book in books], book_index=book_index)
+    return result
+
 
+def book_groups(name: str, books: list[BookShape], continuous: bool):
+    """Name, books and whether bookmarks name their book, for every schedule"""
+    if continuous:
+        return [(name, books, True)]
+    return [(book.bookname, [book], False) for book in books]
 
-def schedule_book_by_section(book: BookData, section_freq: int = 0):
-    chapters = book.book
-    total_sections = sum(len(ch) for ch in chapters)
+
+def schedule_book_by_section(book: BookShape, section_freq: int = 0):
+    total_sections = book.total_sections
 
     if section_freq:
         days_to_complete = math.ceil(total_sections / section_freq)
@@ -47,10 +105,10 @@ def schedule_book_by_section(book: BookData, section_freq: int = 0):
         section_per_day = 2
         days_to_complete = math.ceil(total_sections / section_per_day)
 
-    chapters = get_book_bookmarks(chapters, section_per_day)
+    positions = iter_positions([book], every(total_sections, section_per_day))
 
-    return ScheduleResponse(
-        schedule=list(chapters),
+    return CompactScheduleResponse(
+        **columns(positions, ("chapter", "section"), [book], named=False),
         total_units=total_sections,
         days_to_complete=days_to_complete,
         units_per_day=section_per_day,
@@ -58,9 +116,8 @@ def schedule_book_by_section(book: BookData, section_freq: int = 0):
     )
 
 
-def schedule_book_by_chapter(book: BookData, chapter_freq: int = 0):
-    chapters = book.book
-    total_chapters = len(chapters)
+def schedule_book_by_chapter(book: BookShape, chapter_freq: int = 0):
+    total_chapters = len(book.shape)
 
     if chapter_freq:
         days_to_complete = math.ceil(total_chapters / chapter_freq)
@@ -70,14 +127,10 @@ def schedule_book_by_chapter(book: BookData, chapter_freq: int = 0):
         chapter_per_day = 1
         days_to_complete = math.ceil(total_chapters / chapter_per_day)
 
-    bookmarks = [
-        SectionsBookmark(section=1, chapter=i)
-        for i in range(chapter_per_day, total_chapters, chapter_per_day)
-    ]
-    bookmarks.append(SectionsBookmark(section=1, chapter=total_chapters))
+    positions = iter_positions([book], every(total_chapters, chapter_per_day), by_chapter=True)
 
-    return ScheduleResponse(
-        schedule=bookmarks,
+    return CompactScheduleResponse(
+        **columns(positions, ("chapter", "section"), [book], named=False),
         total_units=total_chapters,
         days_to_complete=days_to_complete,
         units_per_day=chapter_per_day,
@@ -85,12 +138,103 @@ def schedule_book_by_chapter(book: BookData, chapter_freq: int = 0):
     )
 
 
-def schedule_by_section(books: list[BookData], freq: SectionInterval):
+def schedule_by_section(books: list[BookShape], freq: SectionInterval):
     if freq.section:
         return [schedule_book_by_section(book, freq.section) for book in books]
     return [schedule_book_by_chapter(book, freq.chapter) for book in books]
 
 
+def schedule_continuous(name: str, books: list[BookShape], freq: SectionInterval):
+    """One schedule for all the books, learned one after the other"""
+    by_chapter = not freq.section
+    units_per_day = freq.section or freq.chapter
+    total_units = sum(len(book.shape) if by_chapter else book.total_sections for book in books)
+    positions = iter_positions(books, every(total_units, units_per_day), by_chapter)
+
+    return CompactScheduleResponse(
+        **columns(positions, ("chapter", "section"), books, named=True),
+        total_units=total_units,
+        days_to_complete=math.ceil(total_units / units_per_day),
+        units_per_day=units_per_day,
+        book=name,
+    )
+
+
+def schedule_by_page(name: str, books: list[BookShape], page_freq: int, continuous: bool = False):
+    """Schedule `page_freq` dafim a day, bookmarks are the amud each day ends at"""
+    if not all(book.paged for book in books):
+        raise HTTPException(status_code=400, detail="Book is not divided into pages")
+
+    amudim_per_day = 2 * page_freq
+    responses = []
+    for bookname, group, named in book_groups(name, books, continuous):
+        total_amudim = sum(len(book.pages) for book in group)
+        positions = iter_pages(group, every(total_amudim, amudim_per_day))
+        responses.append(
+            CompactScheduleResponse(
+                **columns(positions, ("page", "amud"), group, named),
+                total_units=total_amudim,
+                days_to_complete=math.ceil(total_amudim / amudim_per_day),
+                units_per_day=amudim_per_day,
+                book=bookname,
+            )
+        )
+    return responses
+
+
+def schedule_by_days(
+    name: str,
+    books: list[BookShape],
+    total_days: int,
+    continuous: bool = False,
+    weights: dict[str, Weights] | None = None,
+):
+    """
+    Split the sections into `total_days` days of nearly equal length, or,
+    given the words in each section, of nearly equal reading load.
+    """
+    responses = []
+    for bookname, group, named in book_groups(name, books, continuous):
+        total_sections = sum(book.total_sections for book in group)
+        if weights:
+            prefix = [0, *accumulate(chain.from_iterable(weights[book.bookname] for book in group))]
+            ends = linear_partition(prefix, total_days)
+        else:
+            ends = balanced(range(total_sections + 1), total_days)
+        responses.append(
+            CompactScheduleResponse(
+                **columns(iter_positions(group, ends), ("chapter", "section"), group, named),
+                total_units=total_sections,
+                days_to_complete=len(ends),
+                units_per_day=math.ceil(total_sections / max(len(ends), 1)),
+                book=bookname,
+            )
+        )
+    return responses
+
+
+def schedule_by_load(
+    name: str,
+    books: list[BookShape],
+    section_freq: int,
+    weights: dict[str, Weights],
+    continuous: bool = False,
+):
+    """As many days as `section_freq` sections a day take, of nearly equal reading load"""
+    if continuous:
+        total_sections = sum(book.total_sections for book in books)
+        return schedule_by_days(name, books, math.ceil(total_sections / section_freq), True, weights)
+    return [
+        schedule_by_days(name, [book], math.ceil(book.total_sections / section_freq), False, weights)[0]
+        for book in books
+    ]
+
+
+async def fetch_book_weights(books: list[BookShape]) -> dict[str, Weights]:
+    names = [book.bookname for book in books]
+    return dict(zip(names, await asyncio.gather(*map(fetch_weights, names))))
+
+
 @app.get("/")
 async def root():
     return {"message": "Mishna Learning Schedule API", "version": "1.0"}
@@ -101,15 +245,95 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/schedule", response_model=list[ScheduleResponse])
-async def create_schedule(book_name: str, request: ScheduleRequest):
-    """Create a learning schedule based on frequency or total days"""
-    books = await fetch(book_name)
+caches = {
+    "profiles": fetch_profile.cache,
+    "books": fetch.cache,
+}
+
+
+@app.get("/health/cache", include_in_schema=False)
+async def cache_stats():
+    return {name: cache.stats for name, cache in caches.items()}
+
+
+@metrics.collector
+def cache_samples():
+    for name, cache in caches.items():
+        for result, count in cache.stats.items():
+            yield "cache_total", "counter", {"cache": name, "result": result}, count
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled, set SCHEDULER_METRICS=1")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def schedule(
+    book_name: str,
+    books: list[BookShape],
+    request: ScheduleRequest,
+    continuous: bool,
+    weights: dict[str, Weights] | None,
+) -> list[CompactScheduleResponse]:
+    if weights is not None:
+        if request.is_days():
+            return schedule_by_days(book_name, books, request.total_days, continuous, weights)
+        return schedule_by_load(book_name, books, request.section_freq.section, weights, continuous)
 
     if request.is_section():
+        if continuous:
+            return [schedule_continuous(book_name, books, request.section_freq)]
         return schedule_by_section(books, request.section_freq)
     elif request.is_page():
-        pass
+        return schedule_by_page(book_name, books, request.page_freq, continuous)
     elif request.is_days():
-        pass
+        return schedule_by_days(book_name, books, request.total_days, continuous)
     return list()
+
+
+@app.post("/schedule", response_model=list[ScheduleResponse], response_model_exclude_none=True)
+async def create_schedule(
+    book_name: str,
+    request: ScheduleRequest,
+    continuous: bool = False,
+    weighted: bool = False,
+    format: Literal["full", "compact", "ndjson", "msgpack"] = Query(
+        "full",
+        description="full: a bookmark object per day. compact: columns of numbers per schedule, "
+        "as json, as a json line per schedule (ndjson) or as msgpack",
+    ),
+):
+    """
+    Create a learning schedule based on frequency or total days.
+    A continuous schedule learns all the books of a corpus as one stream,
+    instead of a schedule per book. A weighted schedule splits sections into
+    days of nearly equal length in words, rather than in sections.
+    """
+    if format == "msgpack" and msgpack is None:
+        raise HTTPException(status_code=406, detail="msgpack is not available")
+
+    if weighted and not (request.is_days() or request.section_freq.section):
+        raise HTTPException(status_code=400, detail="Only section and total days schedules can be weighted")
+
+    books = await fetch(book_name)
+    weights = await fetch_book_weights(books) if weighted else None
+
+    with metrics.stage("schedule", books=size_class(len(books))) as stage:
+        schedules = schedule(book_name, books, request, continuous, weights)
+        stage.label(rows=size_class(sum(response.days_to_complete for response in schedules)))
+
+    if format == "compact":
+        return Response(compact_schedules.dump_json(schedules), media_type="application/json")
+    if format == "ndjson":
+        return StreamingResponse(
+            (f"{response.model_dump_json()}\n" for response in schedules),
+            media_type="application/x-ndjson",
+        )
+    if format == "msgpack":
+        return Response(
+            msgpack.packb(compact_schedules.dump_python(schedules)),
+            media_type="application/msgpack",
+        )
+    return [response.expand() for response in schedules]
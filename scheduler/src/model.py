@@ -1,4 +1,9 @@
-from pydantic import BaseModel, model_validator
+from itertools import accumulate, repeat
+from typing import Sequence
+
+from pydantic import BaseModel, PrivateAttr, model_validator
+
+from src.schedule import locate_section
 
 
 # Inner Models
@@ -7,11 +12,39 @@ Section = str
 Chapter = list[Section]
 Book = list[Chapter]
 Corpus = list[Book]
+Shape = list[int]  # sections per chapter
+Weights = Sequence[int]  # words per section, chapter after chapter
 
 
-class BookData(BaseModel):
+class BookShape(BaseModel):
     bookname: str
-    book: Book
+    shape: Shape
+    paged: bool = False  # chapters are amudim, 1a, 1b, 2a...
+    _prefix: list[int] = PrivateAttr(default_factory=list)  # sections before each chapter
+    _pages: range = PrivateAttr(default=range(0))
+
+    def model_post_init(self, __context) -> None:
+        self._prefix = [0, *accumulate(self.shape)]
+        filled = [i for i, sections in enumerate(self.shape) if sections]
+        if filled:
+            self._pages = range(filled[0], filled[-1] + 1)
+
+    @property
+    def pages(self) -> range:
+        """Indices of the chapters from the first to the last one with content"""
+        return self._pages
+
+    @property
+    def prefix(self) -> list[int]:
+        return self._prefix
+
+    @property
+    def total_sections(self) -> int:
+        return self._prefix[-1]
+
+    def locate(self, section: int) -> tuple[int, int]:
+        """1-indexed chapter, and section within it, of the book's n-th section"""
+        return locate_section(self._prefix, section)
 
 
 # Input Models
@@ -70,21 +103,63 @@ class SectionsBookmark(Bookmark):
     section: int | None = None
     chapter: int | None = None
     part: int | None = None
+    book: str | None = None
 
     @model_validator(mode="after")
     def not_empty_validator(self):
-        if not any(self.model_dump().values()):
+        if not any((self.section, self.chapter, self.part, self.book)):
             raise ValueError("One field should be non-empty")
         return self
 
 
 class PageBookmark(Bookmark):
     page: int
+    amud: str | None = None
+    book: str | None = None
 
 
 class ScheduleResponse(BaseModel):
-    schedule: list[SectionsBookmark]
+    schedule: list[SectionsBookmark | PageBookmark]
+    book: str
+    total_units: int
+    days_to_complete: int
+    units_per_day: int
+
+
+class CompactScheduleResponse(BaseModel):
+    """
+    A ScheduleResponse as columns: the i-th bookmark is chapter[i] and
+    section[i] (or page[i] and amud[i]), in books[book_index[i]] for a
+    continuous schedule.
+    """
+
     book: str
     total_units: int
     days_to_complete: int
     units_per_day: int
+    chapter: list[int] = []
+    section: list[int] = []
+    page: list[int] = []
+    amud: list[str] = []
+    books: list[str] = []
+    book_index: list[int] = []
+
+    def expand(self) -> ScheduleResponse:
+        names = [self.books[i] for i in self.book_index] if self.books else repeat(None)
+        if self.page:
+            schedule = [
+                PageBookmark.model_construct(page=page, amud=amud, book=name)
+                for page, amud, name in zip(self.page, self.amud, names)
+            ]
+        else:
+            schedule = [
+                SectionsBookmark.model_construct(chapter=chapter, section=section, book=name)
+                for chapter, section, name in zip(self.chapter, self.section, names)
+            ]
+        return ScheduleResponse.model_construct(
+            schedule=schedule,
+            book=self.book,
+            total_units=self.total_units,
+            days_to_complete=self.days_to_complete,
+            units_per_day=self.units_per_day,
+        )
@@ -0,0 +1,114 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+from typing import Iterable, Iterator, Sequence
+
+
+def every(total: int, interval: int) -> Iterable[int]:
+    """Last unit of each day of `interval` units, the last day may be shorter"""
+    if not total:
+        return ()
+    return chain(range(interval, total, interval), [total])
+
+
+def balanced(prefix: Sequence[float], days: int) -> list[int]:
+    """
+    Last unit of each of `days` days of nearly equal weight, given the
+    weight before each unit (prefix sums, prefix[0] == 0). Every day ends at
+    the unit whose cumulative weight is closest to its share of the total,
+    found by bisection, so a split costs O(days * log(units)).
+    An unweighted split takes range(units + 1) as its prefix.
+    """
+    units = len(prefix) - 1
+    days = min(days, units)
+    if days <= 0:
+        return []
+    total = prefix[-1]
+    ends = []
+    last = 0
+    for day in range(1, days):
+        target = total * day / days
+        end = bisect_left(prefix, target, last + 1, units)
+        if end > last + 1 and target - prefix[end - 1] < prefix[end] - target:
+            end -= 1
+        # leave at least a unit for each of the remaining days
+        last = min(end, units - (days - day))
+        ends.append(last)
+    ends.append(units)
+    return ends
+
+
+def linear_partition(prefix: Sequence[int], days: int) -> list[int]:
+    """
+    Last unit of each of `days` days, given the integer weight before each
+    unit (prefix sums), such that the heaviest day is as light as possible
+    (the linear partition problem).
+    The lightest possible heaviest day is found by binary search, checking
+    each candidate by greedily filling days by bisection. Every day then ends
+    as close to an equal share of what is left as that bound, and the days
+    after it, allow. O(days * log(units) * log(total weight)).
+    """
+    units = len(prefix) - 1
+    days = min(days, units)
+    if days <= 0:
+        return []
+    total = prefix[-1]
+    if not total:
+        return balanced(range(units + 1), days)
+
+    def reach(pos: int, capacity: int) -> int:
+        return bisect_right(prefix, prefix[pos] + capacity, pos) - 1
+
+    def fits(capacity: int) -> bool:
+        pos = 0
+        for _ in range(days):
+            pos = reach(pos, capacity)
+        return pos == units
+
+    low, high = -(-total // days), total
+    while low < high:
+        mid = (low + high) // 2
+        if fits(mid):
+            high = mid
+        else:
+            low = mid + 1
+
+    # earliest unit the last `days_left` days can start at
+    earliest = [units]
+    for _ in range(days - 1):
+        earliest.append(bisect_left(prefix, prefix[earliest[-1]] - low))
+
+    ends = []
+    pos = 0
+    for day in range(1, days):
+        days_left = days - day
+        first, last = max(earliest[days_left], pos + 1), min(reach(pos, low), units - days_left)
+        target = prefix[pos] + (total - prefix[pos]) / (days_left + 1)
+        end = min(bisect_left(prefix, target, first, last), last)
+        if end > first and target - prefix[end - 1] < prefix[end] - target:
+            end -= 1
+        pos = end
+        ends.append(pos)
+    ends.append(units)
+    return ends
+
+
+def locate(sizes: Sequence[int], units: Iterable[int]) -> Iterator[tuple[int, int]]:
+    """
+    Book index, and 1-indexed unit within that book, of units counted
+    across books learned one after the other.
+    """
+    ends = list(accumulate(sizes))
+    for unit in units:
+        idx = bisect_left(ends, unit)
+        yield idx, unit - (ends[idx - 1] if idx else 0)
+
+
+def locate_section(prefix: Sequence[int], section: int) -> tuple[int, int]:
+    """1-indexed chapter, and section within it, given the sections before each chapter"""
+    chapter = bisect_left(prefix, section)
+    return chapter, section - prefix[chapter - 1]
+
+
+def daf(amud: int) -> tuple[int, str]:
+    """Page and side of the 0-indexed amud, 0 is 1a"""
+    return amud // 2 + 1, "ab"[amud % 2]
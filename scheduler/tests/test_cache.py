@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from src import cache
+from src.cache import TieredCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_memory_hit(tmp_path):
+    tiered = TieredCache(namespace="books", directory=str(tmp_path))
+    run(tiered.set("Genesis", [31, 25]))
+    assert run(tiered.get("Genesis")) == [31, 25]
+    assert tiered.stats["memory_hits"] == 1
+
+
+def test_disk_hit_after_restart(tmp_path):
+    run(TieredCache(namespace="books", directory=str(tmp_path)).set("Genesis", [31, 25]))
+    restarted = TieredCache(namespace="books", directory=str(tmp_path))
+    assert run(restarted.get("Genesis")) == [31, 25]
+    assert restarted.stats["disk_hits"] == 1
+    # read from disk once, then from memory
+    assert run(restarted.get("Genesis")) == [31, 25]
+    assert restarted.stats["memory_hits"] == 1
+
+
+def test_memory_only_miss():
+    tiered = TieredCache(namespace="books")
+    assert run(tiered.get("Genesis")) is None
+    assert tiered.stats["misses"] == 1
+
+
+def test_lru_eviction():
+    tiered = TieredCache(namespace="books", max_entries=2)
+    run(tiered.set("Genesis", 1))
+    run(tiered.set("Exodus", 2))
+    run(tiered.get("Genesis"))  # Exodus is now the least recently used
+    run(tiered.set("Leviticus", 3))
+    assert tiered.stats["evictions"] == 1
+    assert run(tiered.get("Exodus")) is None
+    assert run(tiered.get("Genesis")) == 1
+    assert run(tiered.get("Leviticus")) == 3
+
+
+def test_evicted_entry_still_on_disk(tmp_path):
+    tiered = TieredCache(namespace="books", max_entries=1, directory=str(tmp_path))
+    run(tiered.set("Genesis", 1))
+    run(tiered.set("Exodus", 2))
+    assert run(tiered.get("Genesis")) == 1
+    assert tiered.stats["disk_hits"] == 1
+
+
+def test_ttl_expiry(tmp_path, clock):
+    tiered = TieredCache(namespace="books", directory=str(tmp_path))
+    run(tiered.set("Genesis", 1, ttl=60))
+    clock[0] += 59
+    assert run(tiered.get("Genesis")) == 1
+    clock[0] += 2
+    assert run(tiered.get("Genesis")) is None
+    assert tiered.stats["expired"] == 1
+    # dropped from the disk tier too
+    assert run(TieredCache(namespace="books", directory=str(tmp_path)).get("Genesis")) is None
+
+
+def test_clear_namespace(tmp_path):
+    tiered = TieredCache(directory=str(tmp_path))
+    run(tiered.set("Genesis", 1, namespace="shapes"))
+    run(tiered.set("Genesis", 2, namespace="weights"))
+    run(tiered.clear(namespace="shapes"))
+    assert run(tiered.get("Genesis", namespace="shapes")) is None
+    assert run(tiered.get("Genesis", namespace="weights")) == 2
+    restarted = TieredCache(directory=str(tmp_path))
+    assert run(restarted.get("Genesis", namespace="shapes")) is None
+    assert run(restarted.get("Genesis", namespace="weights")) == 2
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.client import SefariaClient
+
+
+def client_answering(*statuses: int) -> tuple[SefariaClient, list[httpx.Request]]:
+    """A client whose requests get `statuses` in turn, and the requests it sent"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(statuses[len(requests) - 1], json={})
+
+    client = SefariaClient("https://sefaria.test", retries=2, backoff=0, transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def test_retries_server_errors():
+    client, requests = client_answering(503, 429, 200)
+    response = asyncio.run(client.get_text("Genesis"))
+    assert response.status_code == 200
+    assert len(requests) == 3
+    assert requests[0].url.path == "/api/v3/texts/Genesis"
+
+
+def test_gives_up_after_the_last_retry():
+    client, requests = client_answering(500, 500, 500)
+    assert asyncio.run(client.get_text("Genesis")).status_code == 500
+    assert len(requests) == 3
+
+
+def test_does_not_retry_client_errors():
+    client, requests = client_answering(404)
+    assert asyncio.run(client.get_text("Missing")).status_code == 404
+    assert len(requests) == 1
+
+
+def test_retries_connection_errors():
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={})
+
+    client = SefariaClient("https://sefaria.test", retries=2, backoff=0, transport=httpx.MockTransport(handler))
+    assert asyncio.run(client.get_text("Genesis")).status_code == 200
+
+    attempts.clear()
+    client = SefariaClient("https://sefaria.test", retries=1, backoff=0, transport=httpx.MockTransport(handler))
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(client.get_text("Genesis"))
+    assert len(attempts) == 2